@@ -1,29 +1,304 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, render_template, request, redirect, url_for, flash, session, g, jsonify, abort, Response, stream_with_context, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+import click
+import csv
+import hmac
+import json
+import mimetypes
+import operator
+import time
+from bisect import bisect_left, bisect_right
 import os
+import sqlite3
+import sys
+from collections import namedtuple
 from datetime import datetime
 from functools import wraps
 from flask_migrate import Migrate
+from assets import SUFFIXES, load_manifest
+from cache import cached, create_cache, make_key
+from jobs import JobQueue
+from metrics import RequestMetrics
+from passwords import HasherBusy, PasswordHasher
+from profiling import FORMATS, Profiler, ProfilerBusy, stats_text
+from regions import REGIONS_VARIANTS, REGIONS_VERSION, find_state, is_daira
+from slowlog import SlowQueryLog
+from throttle import create_login_throttle
+from sqlalchemy import and_, case, event, func, literal, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import aliased, joinedload
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+def env_flag(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+def database_uri():
+    uri = os.environ.get('DATABASE_URL', 'sqlite:///tabaro3.db')
+    # بعض المستضيفين يعطون postgres:// بينما SQLAlchemy 1.4 يقبل postgresql:// فقط
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+def engine_options(uri):
+    # إعدادات مجمع الاتصالات لقواعد الخادم (PostgreSQL)؛ SQLite يستعمل مجمعه الخاص
+    options = {'pool_pre_ping': env_flag('DB_POOL_PRE_PING', True)}
+    if not uri.startswith('sqlite'):
+        options.update(
+            pool_size=env_int('DB_POOL_SIZE', 10),
+            max_overflow=env_int('DB_MAX_OVERFLOW', 20),
+            pool_recycle=env_int('DB_POOL_RECYCLE', 1800),
+            pool_timeout=env_int('DB_POOL_TIMEOUT', 30),
+        )
+    return options
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your_secret_key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///tabaro3.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# إعدادات SQLite للنشر على خادم واحد، انظر set_sqlite_pragmas
+app.config['SQLITE_PRAGMAS'] = env_flag('SQLITE_PRAGMAS', True)
+app.config['SQLITE_CACHE_SIZE_KB'] = env_int('SQLITE_CACHE_SIZE_KB', 20000)
+app.config['SQLITE_MMAP_SIZE'] = env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)
+# معامل العمل لتجزئة كلمات المرور وحدود التزامن، انظر passwords.py
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:260000')
+app.config['PASSWORD_HASH_WORKERS'] = env_int('PASSWORD_HASH_WORKERS', 2)
+app.config['PASSWORD_HASH_MAX_PENDING'] = env_int('PASSWORD_HASH_MAX_PENDING', 32)
+# حدود محاولات تسجيل الدخول: local داخل العامل أو cache مشتركة، انظر throttle.py
+app.config['LOGIN_THROTTLE_BACKEND'] = os.environ.get('LOGIN_THROTTLE_BACKEND', 'local')
+app.config['LOGIN_RATE_IP_CAPACITY'] = env_int('LOGIN_RATE_IP_CAPACITY', 20)
+app.config['LOGIN_RATE_IP_PER_MINUTE'] = env_int('LOGIN_RATE_IP_PER_MINUTE', 10)
+app.config['LOGIN_RATE_USERNAME_CAPACITY'] = env_int('LOGIN_RATE_USERNAME_CAPACITY', 5)
+app.config['LOGIN_RATE_USERNAME_PER_MINUTE'] = env_int('LOGIN_RATE_USERNAME_PER_MINUTE', 5)
+# عدد المفاتيح (عناوين وأسماء مستخدمين) المحفوظة في ذاكرة المحدد المحلية لكل نوع
+app.config['LOGIN_THROTTLE_MAX_KEYS'] = env_int('LOGIN_THROTTLE_MAX_KEYS', 100000)
+# عدد الوكلاء العكسيين (IIS أو nginx أمام gunicorn) الموثوقين في X-Forwarded-For. بدونه يكون
+# remote_addr عنوان الوكيل، فيصبح حد محاولات الدخول لكل IP حداً واحداً لكل الزوار
+app.config['PROXY_FIX_X_FOR'] = env_int('PROXY_FIX_X_FOR', 0)
+app.config['SEARCH_PAGE_SIZE'] = 25
+app.config['SEARCH_MAX_PAGE_SIZE'] = 100
+app.config['REQUESTS_PAGE_SIZE'] = 20
+app.config['REQUESTS_MAX_PAGE_SIZE'] = 100
+app.config['ADMIN_PAGE_SIZE'] = 25
+app.config['ADMIN_MAX_PAGE_SIZE'] = 100
+app.config['HOME_CACHE_TTL'] = 60
+app.config['SEARCH_CACHE_MAX_IDS'] = 5000
+# local أو redis أو null، انظر cache.py
+app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'local')
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+app.config['CACHE_KEY_PREFIX'] = 'tabaro3:'
+app.config['CACHE_MAX_ENTRIES'] = 4096
+app.config['CACHE_DEFAULT_TTL'] = 300
+# نتائج البحث تُبطل برقم إصدار في الذاكرة المؤقتة. مع local يبقى الرقم خاصاً بالعامل الذي نفذ
+# التعديل، فتعرض بقية عمال gunicorn قوائم بلا المتبرعين الجدد أو المعدلين حتى انتهاء المدة،
+# لذلك هي 30 ثانية فقط؛ مع redis يصل الإبطال لكل العمال فوراً فتطول المدة
+app.config['SEARCH_CACHE_TTL'] = env_int('SEARCH_CACHE_TTL', 600 if app.config['CACHE_TYPE'] == 'redis' else 30)
+# طابور المهام الخلفية (ملف SQLite منفصل عن قاعدة التطبيق)، انظر jobs.py
+app.config['JOB_QUEUE_PATH'] = os.environ.get('JOB_QUEUE_PATH', os.path.join(app.instance_path, 'jobs.db'))
+app.config['JOB_WORKERS'] = env_int('JOB_WORKERS', 1)
+# عدد المتبرعين المقترحين المعروضين لكل طلب في لوحة التحكم، وأقصى عدد محفوظ لكل طلب في
+# request_donor_match (بدونه يبلغ الجدول ~1.2 مليون صف عند 100k مستخدم)
+app.config['DONOR_MATCH_LIMIT'] = 50
+app.config['DONOR_MATCH_STORE_LIMIT'] = env_int('DONOR_MATCH_STORE_LIMIT', 200)
+# قياسات الطلبات في /admin/metrics، انظر metrics.py. METRICS_TOKEN يسمح لـ Prometheus بالقراءة بدون جلسة
+app.config['METRICS_ENABLED'] = env_flag('METRICS_ENABLED', False)
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+# مجلد مشترك يكتب فيه كل عامل قيمه ليجمعها /admin/metrics من كل العمال؛ يُفرغ عند إعادة تشغيل الخادم
+app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR', os.path.join(app.instance_path, 'metrics'))
+# سجل الاستعلامات البطيئة مع خطة التنفيذ، يُفعّل بتحديد SLOW_QUERY_LOG (مسار الملف)، انظر slowlog.py
+app.config['SLOW_QUERY_LOG'] = os.environ.get('SLOW_QUERY_LOG')
+app.config['SLOW_QUERY_MS'] = env_int('SLOW_QUERY_MS', 200)
+app.config['SLOW_QUERY_LOG_MAX_BYTES'] = env_int('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024)
+app.config['SLOW_QUERY_LOG_BACKUPS'] = env_int('SLOW_QUERY_LOG_BACKUPS', 5)
+# تشخيص العمال الحية (/admin/profile وترويسة X-Profile)، انظر profiling.py. PROFILING_TOKEN بديل عن جلسة المدير
+app.config['PROFILING_ENABLED'] = env_flag('PROFILING_ENABLED', False)
+app.config['PROFILING_TOKEN'] = os.environ.get('PROFILING_TOKEN')
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+app.config['PROFILE_MAX_SECONDS'] = env_int('PROFILE_MAX_SECONDS', 60)
+app.config['PROFILE_MAX_FILES'] = 50
+
+if app.config['PROXY_FIX_X_FOR']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL يسمح للقراء (home وsearch) بالعمل أثناء commit الكتّاب (register وrequest_blood)
+    if not isinstance(dbapi_connection, sqlite3.Connection) or not app.config['SQLITE_PRAGMAS']:
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f"PRAGMA cache_size=-{app.config['SQLITE_CACHE_SIZE_KB']}")
+    cursor.execute(f"PRAGMA mmap_size={app.config['SQLITE_MMAP_SIZE']}")
+    cursor.execute(f"PRAGMA busy_timeout={app.config['SQLITE_BUSY_TIMEOUT_MS']}")
+    cursor.close()
 
 db = SQLAlchemy(app)
 migrate = Migrate(app, db)
+cache = create_cache(app.config)
+hasher = PasswordHasher(
+    app.config['PASSWORD_HASH_METHOD'],
+    max_workers=app.config['PASSWORD_HASH_WORKERS'],
+    max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+)
+login_throttle = create_login_throttle(app.config, cache)
+jobs = JobQueue(app.config['JOB_QUEUE_PATH'])
+jobs.context = app.app_context
+metrics = RequestMetrics(directory=app.config['METRICS_DIR'])
+if app.config['METRICS_ENABLED']:
+    metrics.init_app(app, db.engine)
+profiler = Profiler(
+    app.config['PROFILE_DIR'],
+    max_seconds=app.config['PROFILE_MAX_SECONDS'],
+    max_files=app.config['PROFILE_MAX_FILES'],
+)
+if app.config['SLOW_QUERY_LOG']:
+    SlowQueryLog(
+        app.config['SLOW_QUERY_LOG'],
+        threshold_ms=app.config['SLOW_QUERY_MS'],
+        max_bytes=app.config['SLOW_QUERY_LOG_MAX_BYTES'],
+        backups=app.config['SLOW_QUERY_LOG_BACKUPS'],
+    ).init_app(db.engine)
+
+def start_job_workers():
+    # خيوط العمال داخل عملية الويب؛ JOB_WORKERS=0 عند تشغيل flask jobs work في عملية مستقلة.
+    # مع معيد التحميل في وضع التطوير لا تبدأ إلا في العملية الفرعية التي تخدم الطلبات
+    if app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+    if app.config['JOB_WORKERS']:
+        jobs.start(app.config['JOB_WORKERS'])
 
 # Add a function to get the current user
+# النتيجة محفوظة في flask.g طوال الطلب، فلا يكلف الطلب أكثر من استعلام واحد للمستخدم
 def get_current_user():
-    if 'user_id' in session:
-        return User.query.get(session['user_id'])
-    return None
+    user_id = session.get('user_id')
+    current = g.get('current_user')
+    if current is None or current[0] != user_id:
+        user = User.query.get(user_id) if user_id is not None else None
+        current = g.current_user = (user_id, user)
+    return current[1]
+
+def forget_current_user():
+    g.pop('current_user', None)
 
 # Make the function available to all templates
 @app.context_processor
 def utility_processor():
-    return dict(get_current_user=get_current_user)
+    return dict(get_current_user=get_current_user, regions_version=REGIONS_VERSION)
+
+# بيانات الولايات والدوائر كـ JSON برابط يتغير مع المحتوى، فيحفظها المتصفح سنة كاملة
+# والنسخ المضغوطة محسوبة مرة واحدة عند تحميل regions.py
+@app.route('/regions.<version>.json')
+def regions_json(version):
+    if version != REGIONS_VERSION:
+        return redirect(url_for('regions_json', version=REGIONS_VERSION))
+    encoding = next(
+        (e for e in ('br', 'gzip') if e in REGIONS_VARIANTS and request.accept_encodings[e]), 'identity'
+    )
+    response = Response(REGIONS_VARIANTS[encoding], mimetype='application/json')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = 365 * 24 * 3600
+    response.cache_control.immutable = True
+    response.set_etag(f'{REGIONS_VERSION}-{encoding}')
+    return response.make_conditional(request)
+
+# الملفات الثابتة المبنية بـ flask build-assets (انظر assets.py)؛ قبل البناء يبقى السلوك الافتراضي
+ASSET_FILES, ASSET_ENCODINGS = load_manifest(app.static_folder)
+
+@app.url_defaults
+def fingerprint_static(endpoint, values):
+    if endpoint == 'static' and values.get('filename') in ASSET_FILES:
+        values['filename'] = ASSET_FILES[values['filename']]
+
+def serve_static(filename):
+    if filename not in ASSET_ENCODINGS:
+        return app.send_static_file(filename)
+    encoding = next((e for e in ASSET_ENCODINGS[filename] if request.accept_encodings[e]), None)
+    response = send_from_directory(
+        app.static_folder,
+        filename + SUFFIXES[encoding] if encoding else filename,
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=365 * 24 * 3600,
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+app.view_functions['static'] = serve_static
+
+# صفحة من نتائج الترقيم بالمؤشر (keyset): العناصر ومؤشرا الصفحة التالية والسابقة
+KeysetPage = namedtuple('KeysetPage', ['items', 'next_cursor', 'prev_cursor'])
+
+def page_size_arg(default_key, max_key):
+    per_page = request.values.get('per_page', type=int) or app.config[default_key]
+    return max(1, min(per_page, app.config[max_key]))
+
+CURSOR_DATETIME_FORMAT = '%Y%m%d%H%M%S%f'
+
+def encode_cursor(values):
+    return '_'.join(
+        value.strftime(CURSOR_DATETIME_FORMAT) if isinstance(value, datetime) else str(value)
+        for value in values
+    )
+
+def cursor_datetime(value):
+    return datetime.strptime(value, CURSOR_DATETIME_FORMAT)
+
+def decode_cursor(token, *types):
+    # types: دوال تحويل كل جزء من المؤشر (أعداد صحيحة افتراضياً)
+    # مؤشر غير صالح يعيد الصفحة الأولى بدل خطأ
+    if not token:
+        return None
+    # التقسيم من اليمين يسمح بوجود "_" في الجزء النصي الأول (مثل اسم المستخدم)
+    parts = token.rsplit('_', len(types) - 1) if types else token.split('_')
+    types = types or (int,) * len(parts)
+    if len(parts) != len(types):
+        return None
+    try:
+        return tuple(convert(part) for convert, part in zip(types, parts))
+    except ValueError:
+        return None
+
+def _seek(keys, values, op):
+    if len(keys) == 1:
+        return op(keys[0], values[0])
+    return op(tuple_(*keys), tuple_(*[literal(value, key.type) for key, value in zip(keys, values)]))
+
+def keyset_paginate(query, keys, key_of, after=None, before=None, per_page=25, descending=False):
+    # keys: أعمدة الترتيب، key_of(item): قيم نفس الأعمدة لعنصر من النتائج
+    # نطلب عنصراً إضافياً واحداً لمعرفة وجود صفحة أخرى بدون COUNT
+    forward, backward = (operator.lt, operator.gt) if descending else (operator.gt, operator.lt)
+    forward_order = [key.desc() if descending else key for key in keys]
+    backward_order = [key if descending else key.desc() for key in keys]
+    
+    if before is not None and len(before) == len(keys):
+        rows = query.filter(_seek(keys, before, backward)) \
+            .order_by(*backward_order).limit(per_page + 1).all()
+        items = rows[:per_page][::-1]
+        has_more = len(rows) > per_page
+        prev_cursor = encode_cursor(key_of(items[0])) if has_more else None
+        next_cursor = encode_cursor(key_of(items[-1])) if items else None
+    else:
+        if after is not None and len(after) == len(keys):
+            query = query.filter(_seek(keys, after, forward))
+        else:
+            after = None
+        rows = query.order_by(*forward_order).limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_more = len(rows) > per_page
+        next_cursor = encode_cursor(key_of(items[-1])) if has_more else None
+        prev_cursor = encode_cursor(key_of(items[0])) if after is not None and items else None
+    return KeysetPage(items, next_cursor, prev_cursor)
 
 # Models
 class User(db.Model):
@@ -40,6 +315,12 @@ class User(db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # فهارس مسار البحث عن المتبرعين في search()
+    __table_args__ = (
+        db.Index('ix_user_donor_search', 'is_donor', 'blood_type', 'city', 'district'),
+        db.Index('ix_user_donor_location', 'is_donor', 'city', 'district'),
+    )
+    
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -58,14 +339,55 @@ class BloodRequest(db.Model):
     
     requester = db.relationship('User', backref=db.backref('blood_requests', lazy=True))
     
+    # فهرس قائمة الطلبات المفتوحة في all_requests() مرتبة حسب التاريخ
+    __table_args__ = (
+        db.Index('ix_blood_request_open_created', 'is_fulfilled', 'created_at'),
+    )
+    
     def __repr__(self):
         return f'<BloodRequest {self.id}>'
 
+# أزواج (طلب مفتوح، متبرع متوافق في نفس الولاية)، حتى DONOR_MATCH_STORE_LIMIT لكل طلب،
+# تُحدّث عند تغير الطلب أو ملف المتبرع
+class RequestDonorMatch(db.Model):
+    __tablename__ = 'request_donor_match'
+    request_id = db.Column(db.Integer, db.ForeignKey('blood_request.id'), primary_key=True)
+    donor_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, index=True)
+    is_exact = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    donor = db.relationship('User')
+
+# قوائم الصفحة الرئيسية محفوظة في الذاكرة، وتُحذف عند أي تغيير في طلبات الدم
+# أعمدة فقط بدل كائنات ORM، حتى تبقى القيم صالحة خارج جلسة قاعدة البيانات
+HOME_REQUEST_COLUMNS = (
+    BloodRequest.id, BloodRequest.blood_type, BloodRequest.units_needed, BloodRequest.hospital,
+    BloodRequest.city, BloodRequest.is_urgent, BloodRequest.created_at,
+)
+
+@cached(cache, 'home:requests', ttl=app.config['HOME_CACHE_TTL'])
+def home_request_lists():
+    open_requests = db.session.query(*HOME_REQUEST_COLUMNS) \
+        .filter(BloodRequest.is_fulfilled == False) \
+        .order_by(BloodRequest.created_at.desc())
+    return (
+        open_requests.filter(BloodRequest.is_urgent == True).limit(5).all(),
+        open_requests.limit(10).all(),
+    )
+
+def invalidate_home_requests():
+    home_request_lists.invalidate()
+
+@app.errorhandler(HasherBusy)
+def hasher_busy(e):
+    # مجمع التجزئة ممتلئ أثناء التسجيل أو تغيير كلمة المرور
+    flash('الخادم مشغول حالياً، يرجى المحاولة بعد لحظات.')
+    return render_template('base.html'), 503
+
 # Routes
 @app.route('/')
 def home():
-    urgent_requests = BloodRequest.query.filter_by(is_urgent=True, is_fulfilled=False).order_by(BloodRequest.created_at.desc()).limit(5).all()
-    recent_requests = BloodRequest.query.filter_by(is_fulfilled=False).order_by(BloodRequest.created_at.desc()).limit(10).all()
+    urgent_requests, recent_requests = home_request_lists()
     return render_template('index.html', urgent_requests=urgent_requests, recent_requests=recent_requests)
 
 # تعديل وظيفة التسجيل لاستخدام أسماء الولايات كما هي في ملف algeria_cities.js
@@ -92,7 +414,7 @@ def register():
         new_user = User(
             username=username,
             email=email,
-            password=generate_password_hash(password),
+            password=hasher.hash(password),
             full_name=full_name,
             phone=phone,
             blood_type=blood_type,
@@ -102,36 +424,211 @@ def register():
         )
         
         db.session.add(new_user)
+        if is_donor:
+            refresh_donor_matches(new_user)
         db.session.commit()
+        if is_donor:
+            invalidate_donor_search()
         
         flash('تم التسجيل بنجاح! يرجى تسجيل الدخول.')
         return redirect(url_for('login'))
     
     return render_template('register.html')
 
+# جدول التوافق: فصيلة المستقبل -> فصائل المتبرعين الذين يمكنه الاستقبال منهم
+BLOOD_COMPATIBILITY = {
+    'O-': frozenset({'O-'}),
+    'O+': frozenset({'O-', 'O+'}),
+    'A-': frozenset({'O-', 'A-'}),
+    'A+': frozenset({'O-', 'O+', 'A-', 'A+'}),
+    'B-': frozenset({'O-', 'B-'}),
+    'B+': frozenset({'O-', 'O+', 'B-', 'B+'}),
+    'AB-': frozenset({'O-', 'A-', 'B-', 'AB-'}),
+    'AB+': frozenset({'O-', 'O+', 'A-', 'A+', 'B-', 'B+', 'AB-', 'AB+'}),
+}
+
+# الاتجاه المعاكس: فصيلة المتبرع -> الفصائل التي يمكنه التبرع لها
+BLOOD_DONATES_TO = {
+    donor_type: frozenset(recipient for recipient, donors in BLOOD_COMPATIBILITY.items() if donor_type in donors)
+    for donor_type in BLOOD_COMPATIBILITY
+}
+
+def exact_match_rank(blood_type):
+    # 0 للمطابقة التامة و1 لباقي الفصائل المتوافقة، لعرض المطابقة التامة أولاً
+    return case((User.blood_type == blood_type, 0), else_=1)
+
+def donor_search_query(blood_type=None, state=None, city=None, compatible=False):
+    # is_donor ثابت في بداية الفهرس، ثم فصيلة الدم، ثم الولاية والدائرة
+    query = User.query.filter_by(is_donor=True)
+    
+    if blood_type and compatible and blood_type in BLOOD_COMPATIBILITY:
+        # استعلام IN واحد بدل بحث منفصل لكل فصيلة متوافقة
+        query = query.filter(User.blood_type.in_(sorted(BLOOD_COMPATIBILITY[blood_type])))
+    elif blood_type:
+        query = query.filter_by(blood_type=blood_type)
+    if state:
+        query = query.filter_by(city=state)  # البحث باستخدام الولاية كاملة
+    if city:
+        query = query.filter_by(district=city)  # البحث باستخدام الدائرة
+    
+    return query
+
+# نتائج البحث محفوظة كقائمة مفاتيح ترتيب (المعرف آخرها) لكل تركيبة فصيلة/ولاية/دائرة.
+# رقم الإصدار جزء من المفتاح، وزيادته تُبطل كل النتائج المحفوظة دفعة واحدة
+SEARCH_VERSION_KEY = 'search:version'
+DONOR_SEARCH_FIELDS = ('is_donor', 'blood_type', 'city', 'district')
+
+def donor_search_snapshot(user):
+    return tuple(getattr(user, field) for field in DONOR_SEARCH_FIELDS)
+
+def invalidate_donor_search():
+    cache.incr(SEARCH_VERSION_KEY)
+
+def cached_keyset_page(cache_key, query, keys, after=None, before=None, per_page=25):
+    # مثل keyset_paginate لكن من قائمة المفاتيح المحفوظة، ثم جلب عناصر الصفحة فقط بـ IN
+    # تعيد None إذا تجاوزت النتيجة SEARCH_CACHE_MAX_IDS فيُستعمل الاستعلام المباشر
+    sort_keys = cache.get(cache_key)
+    if sort_keys is None:
+        max_ids = app.config['SEARCH_CACHE_MAX_IDS']
+        rows = query.with_entities(*keys).order_by(*keys).limit(max_ids + 1).all()
+        sort_keys = [tuple(row) for row in rows] if len(rows) <= max_ids else False
+        cache.set(cache_key, sort_keys, app.config['SEARCH_CACHE_TTL'])
+    if sort_keys is False:
+        return None
+    
+    if before is not None and len(before) == len(keys):
+        end = bisect_left(sort_keys, before)
+        start = max(0, end - per_page)
+        window = sort_keys[start:end]
+        prev_cursor = encode_cursor(window[0]) if start > 0 else None
+        next_cursor = encode_cursor(window[-1]) if window else None
+    else:
+        after = after if after is not None and len(after) == len(keys) else None
+        start = bisect_right(sort_keys, after) if after is not None else 0
+        window = sort_keys[start:start + per_page]
+        next_cursor = encode_cursor(window[-1]) if start + per_page < len(sort_keys) else None
+        prev_cursor = encode_cursor(window[0]) if after is not None and window else None
+    
+    ids = [key[-1] for key in window]
+    found = {item.id: item for item in query.filter(keys[-1].in_(ids))} if ids else {}
+    return KeysetPage([found[i] for i in ids if i in found], next_cursor, prev_cursor)
+
 # تعديل وظيفة البحث لاستخدام أسماء الولايات كما هي في ملف algeria_cities.js
 @app.route('/search', methods=['GET', 'POST'])
 def search():
-    if request.method == 'POST':
-        blood_type = request.form.get('blood_type')
-        state = request.form.get('state')  # الولاية بالتنسيق "01 - أدرار"
-        city = request.form.get('city')  # الدائرة
+    # النموذج يرسل POST، وروابط الصفحات التالية/السابقة ترسل GET بنفس المعايير
+    search_args = ('blood_type', 'state', 'city', 'match', 'after', 'before')
+    if request.method == 'POST' or any(arg in request.args for arg in search_args):
+        blood_type = request.values.get('blood_type') or None
+        compatible = request.values.get('match') == 'compatible'
+        filters = dict(
+            blood_type=blood_type,
+            state=request.values.get('state') or None,  # الولاية بالتنسيق "01 - أدرار"
+            city=request.values.get('city') or None,  # الدائرة
+        )
+        per_page = page_size_arg('SEARCH_PAGE_SIZE', 'SEARCH_MAX_PAGE_SIZE')
         
-        query = User.query.filter_by(is_donor=True)
+        # الترتيب بتعبير CASE لا يخدمه الفهرس: كل صفحة تفرز المجموعة المتوافقة كاملة (TEMP B-TREE)،
+        # فكلفة الصفحات العميقة تنمو مع حجم النتيجة، والذي يحميها هو ذاكرة مفاتيح البحث أدناه
+        if compatible and blood_type in BLOOD_COMPATIBILITY:
+            keys = (exact_match_rank(blood_type), User.id)
+            key_of = lambda donor: (0 if donor.blood_type == blood_type else 1, donor.id)
+        else:
+            keys = (User.id,)
+            key_of = lambda donor: (donor.id,)
         
-        if blood_type:
-            query = query.filter_by(blood_type=blood_type)
-        if state:
-            query = query.filter_by(city=state)  # البحث باستخدام الولاية كاملة
-        if city:
-            query = query.filter_by(district=city)  # البحث باستخدام الدائرة
+        query = donor_search_query(compatible=compatible, **filters)
+        after = decode_cursor(request.values.get('after'))
+        before = decode_cursor(request.values.get('before'))
         
-        donors = query.all()
-        return render_template('search_results.html', donors=donors)
+        version = cache.incr(SEARCH_VERSION_KEY, 0)
+        page = None
+        if version is not None:
+            cache_key = make_key('search', (
+                version, blood_type or '', filters['state'] or '', filters['city'] or '',
+                'compatible' if compatible else 'exact',
+            ), {})
+            page = cached_keyset_page(cache_key, query, keys, after, before, per_page)
+        if page is None:
+            page = keyset_paginate(query, keys, key_of, after=after, before=before, per_page=per_page)
+        if compatible:
+            filters['match'] = 'compatible'
+        return render_template('search_results.html', donors=page.items, page=page,
+                               filters=filters, per_page=per_page)
     
-    return render_template('search.html')
+    return render_template('search.html', compatibility=BLOOD_COMPATIBILITY, donates_to=BLOOD_DONATES_TO)
 
 # تعديل وظيفة طلب الدم لاستخدام أسماء الولايات كما هي في ملف algeria_cities.js
+# جدول request_donor_match يُحدّث جزئياً: criteria تحصر الأزواج في طلب واحد أو متبرع واحد،
+# وبدونها تُحسب كل الأزواج (flask rebuild-matches). كل طلب يُكمَّل حتى DONOR_MATCH_STORE_LIMIT
+# بعد المحفوظ له، المطابقة التامة أولاً، والأزواج المحفوظة لا تتكرر. الدوال لا تنفذ commit
+def insert_donor_matches(*criteria):
+    compatible = or_(*(
+        and_(BloodRequest.blood_type == recipient, User.blood_type.in_(sorted(donors)))
+        for recipient, donors in BLOOD_COMPATIBILITY.items()
+    ))
+    is_exact = BloodRequest.blood_type == User.blood_type
+    stored_pair = select(RequestDonorMatch.request_id).where(
+        RequestDonorMatch.request_id == BloodRequest.id, RequestDonorMatch.donor_id == User.id,
+    ).exists()
+    candidates = select(
+        BloodRequest.id.label('request_id'), User.id.label('donor_id'), is_exact.label('is_exact'),
+        func.row_number().over(partition_by=BloodRequest.id, order_by=(is_exact.desc(), User.id)).label('rank'),
+    ).where(
+        BloodRequest.is_fulfilled == False,
+        User.is_donor == True,
+        User.city == BloodRequest.city,
+        User.id != BloodRequest.requester_id,
+        compatible,
+        ~stored_pair,
+        *criteria
+    ).subquery()
+    stored = select(func.count()).where(
+        RequestDonorMatch.request_id == candidates.c.request_id
+    ).scalar_subquery()
+    pairs = select(
+        candidates.c.request_id, candidates.c.donor_id, candidates.c.is_exact,
+        literal(datetime.utcnow(), db.DateTime),
+    ).where(candidates.c.rank + stored <= app.config['DONOR_MATCH_STORE_LIMIT'])
+    return insert_match_rows(pairs)
+
+def insert_match_rows(pairs):
+    # NOT EXISTS في insert_donor_matches لا يمنع كاتبين متزامنين (مهمة match_donors وتعديل
+    # متبرع على الطلب نفسه) من إدراج الزوج ذاته، فيُتجاهل الزوج المحفوظ بدل IntegrityError
+    table = RequestDonorMatch.__table__
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        insert = postgresql.insert(table).on_conflict_do_nothing()
+    elif dialect == 'sqlite':
+        insert = sqlite.insert(table).on_conflict_do_nothing()
+    else:
+        insert = table.insert()
+    db.session.flush()
+    return db.session.execute(insert.from_select(
+        ['request_id', 'donor_id', 'is_exact', 'created_at'], pairs,
+    )).rowcount
+
+def refresh_request_matches(request_id):
+    RequestDonorMatch.query.filter_by(request_id=request_id).delete()
+    return insert_donor_matches(BloodRequest.id == request_id)
+
+def refill_request_matches(request_ids):
+    # الطلبات التي فقدت متبرعاً تُكمَّل بغيره حتى الحد
+    if not request_ids:
+        return 0
+    return insert_donor_matches(BloodRequest.id.in_(request_ids))
+
+def refresh_donor_matches(user):
+    db.session.flush()  # معرف المستخدم الجديد عند التسجيل
+    matched = [request_id for request_id, in db.session.query(RequestDonorMatch.request_id).filter_by(donor_id=user.id)]
+    RequestDonorMatch.query.filter_by(donor_id=user.id).delete()
+    return insert_donor_matches(User.id == user.id) + refill_request_matches(matched)
+
+@jobs.task
+def match_donors(request_id):
+    refresh_request_matches(request_id)
+    db.session.commit()
+
 @app.route('/request_blood', methods=['GET', 'POST'])
 def request_blood():
     if 'user_id' not in session:
@@ -161,6 +658,9 @@ def request_blood():
         
         db.session.add(new_request)
         db.session.commit()
+        # المطابقة قبل تحديث الذاكرة المؤقتة حتى لا يبقى طلب محفوظ بلا مهمة
+        jobs.enqueue('match_donors', priority=0 if is_urgent else 1, request_id=new_request.id)
+        invalidate_home_requests()
         
         flash('تم إرسال طلب الدم بنجاح!')
         return redirect(url_for('dashboard'))
@@ -174,9 +674,10 @@ def edit_profile():
         flash('يرجى تسجيل الدخول للوصول إلى هذه الصفحة.')
         return redirect(url_for('login'))
     
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     
     if request.method == 'POST':
+        search_fields = donor_search_snapshot(user)
         # تحديث بيانات المستخدم
         user.full_name = request.form.get('full_name')
         user.phone = request.form.get('phone')
@@ -188,9 +689,15 @@ def edit_profile():
         # تحديث كلمة المرور إذا تم إدخالها
         new_password = request.form.get('password')
         if new_password:
-            user.password = generate_password_hash(new_password)
+            user.password = hasher.hash(new_password)
         
+        search_changed = donor_search_snapshot(user) != search_fields
+        if search_changed:
+            refresh_donor_matches(user)
         db.session.commit()
+        forget_current_user()
+        if search_changed:
+            invalidate_donor_search()
         flash('تم تحديث البيانات بنجاح!')
         return redirect(url_for('dashboard'))
     
@@ -201,8 +708,30 @@ def edit_profile():
 
 @app.route('/requests')
 def all_requests():
-    requests = BloodRequest.query.filter_by(is_fulfilled=False).order_by(BloodRequest.created_at.desc()).all()
-    return render_template('all_requests.html', requests=requests)
+    filters = dict(
+        blood_type=request.args.get('blood_type') or None,
+        state=request.args.get('state') or None,  # الولاية بالتنسيق "01 - أدرار"
+    )
+    per_page = page_size_arg('REQUESTS_PAGE_SIZE', 'REQUESTS_MAX_PAGE_SIZE')
+    
+    query = BloodRequest.query.filter_by(is_fulfilled=False)
+    if filters['blood_type']:
+        query = query.filter_by(blood_type=filters['blood_type'])
+    if filters['state']:
+        query = query.filter_by(city=filters['state'])
+    
+    # الأحدث أولاً، والمعرف يفصل بين الطلبات المتساوية في التاريخ
+    page = keyset_paginate(
+        query,
+        (BloodRequest.created_at, BloodRequest.id),
+        lambda blood_request: (blood_request.created_at, blood_request.id),
+        after=decode_cursor(request.args.get('after'), cursor_datetime, int),
+        before=decode_cursor(request.args.get('before'), cursor_datetime, int),
+        per_page=per_page,
+        descending=True,
+    )
+    return render_template('all_requests.html', requests=page.items, page=page,
+                           filters=filters, per_page=per_page)
 
 @app.route('/request/<int:request_id>')
 def view_request(request_id):
@@ -222,7 +751,9 @@ def mark_fulfilled(request_id):
         return redirect(url_for('dashboard'))
     
     blood_request.is_fulfilled = True
+    RequestDonorMatch.query.filter_by(request_id=blood_request.id).delete()
     db.session.commit()
+    invalidate_home_requests()
     
     flash('تم تحديث الطلب كمكتمل!')
     return redirect(url_for('dashboard'))
@@ -233,16 +764,34 @@ def dashboard():
         flash('يرجى تسجيل الدخول للوصول إلى لوحة التحكم.')
         return redirect(url_for('login'))
     
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     # Add a check to ensure user exists
     if user is None:
         flash('حدث خطأ في العثور على حسابك. يرجى تسجيل الدخول مرة أخرى.')
         session.pop('user_id', None)  # Clear the invalid session
+        forget_current_user()
         return redirect(url_for('login'))
         
     user_requests = BloodRequest.query.filter_by(requester_id=user.id).order_by(BloodRequest.created_at.desc()).all()
     
-    return render_template('dashboard.html', user=user, requests=user_requests)
+    # المتبرعون المقترحون لكل طلب مفتوح في استعلام واحد، أول DONOR_MATCH_LIMIT لكل طلب
+    matches = {}
+    open_ids = [r.id for r in user_requests if not r.is_fulfilled]
+    if open_ids:
+        ranked = db.session.query(
+            RequestDonorMatch,
+            func.row_number().over(
+                partition_by=RequestDonorMatch.request_id,
+                order_by=(RequestDonorMatch.is_exact.desc(), RequestDonorMatch.donor_id),
+            ).label('rank'),
+        ).filter(RequestDonorMatch.request_id.in_(open_ids)).subquery()
+        match = aliased(RequestDonorMatch, ranked)
+        for row in db.session.query(match).options(joinedload(match.donor)).filter(
+            ranked.c.rank <= app.config['DONOR_MATCH_LIMIT']
+        ).order_by(match.request_id, match.is_exact.desc(), match.donor_id):
+            matches.setdefault(row.request_id, []).append(row)
+    
+    return render_template('dashboard.html', user=user, requests=user_requests, matches=matches)
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -250,9 +799,25 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         
+        # رفض المحاولات الزائدة قبل أي استعلام أو تجزئة
+        if login_throttle.check(request.remote_addr, username):
+            flash('محاولات تسجيل دخول كثيرة، يرجى المحاولة لاحقاً.')
+            return render_template('login.html'), 429
+        
         user = User.query.filter_by(username=username).first()
         
-        if user and check_password_hash(user.password, password):
+        try:
+            verified, new_hash = hasher.verify_and_update(user.password, password) if user else (False, None)
+        except HasherBusy:
+            flash('الخادم مشغول حالياً، يرجى المحاولة بعد لحظات.')
+            return render_template('login.html'), 503
+        login_throttle.record('verified' if verified else 'failed')
+        
+        if verified:
+            # إعادة التجزئة بالمعاملات الحالية إذا تغير PASSWORD_HASH_METHOD
+            if new_hash:
+                user.password = new_hash
+                db.session.commit()
             session['user_id'] = user.id
             flash('تم تسجيل الدخول بنجاح!')
             return redirect(url_for('dashboard'))
@@ -264,6 +829,7 @@ def login():
 @app.route('/logout')
 def logout():
     session.pop('user_id', None)
+    forget_current_user()
     flash('تم تسجيل الخروج بنجاح.')
     return redirect(url_for('home'))
 
@@ -275,7 +841,7 @@ def admin_required(f):
             flash('يرجى تسجيل الدخول أولاً')
             return redirect(url_for('login'))
         
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         if not user or not user.is_admin:
             flash('ليس لديك صلاحية الوصول إلى هذه الصفحة')
             return redirect(url_for('home'))
@@ -287,7 +853,7 @@ def admin_required(f):
 def create_admin():
     # إضافة منطق التحقق من المستخدم الحالي إذا كان مسؤولاً
     if 'user_id' in session:
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         if user is None or not user.is_admin:
             flash('غير مصرح لك بالوصول إلى هذه الصفحة')
             return redirect(url_for('dashboard'))
@@ -332,7 +898,7 @@ def create_admin():
             new_admin = User(
                 username=username,
                 email=email,
-                password=generate_password_hash(password),
+                password=hasher.hash(password),
                 full_name=full_name,
                 phone=phone,
                 is_admin=True,
@@ -403,18 +969,292 @@ def report_donor(donor_id):
     
     return redirect(url_for('search'))
 
-# Modify the admin_dashboard route to include reports
+# لوحة المسؤول: استعلامات عد فقط، والجداول تُحمّل كأجزاء HTML من مسارات admin/panels
 @app.route('/admin_dashboard')
 @admin_required
 def admin_dashboard():
-    # Get all users
-    users = User.query.all()
-    # Get all blood requests
-    blood_requests = BloodRequest.query.order_by(BloodRequest.created_at.desc()).all()
-    # Get all reports
-    reports = DonorReport.query.order_by(desc(DonorReport.created_at)).all()
+    request_counts = dict(
+        db.session.query(BloodRequest.is_fulfilled, func.count(BloodRequest.id))
+        .group_by(BloodRequest.is_fulfilled).all()
+    )
+    stats = dict(
+        users=db.session.query(func.count(User.id)).scalar(),
+        requests=sum(request_counts.values()),
+        active_requests=request_counts.get(False, 0),
+        fulfilled_requests=request_counts.get(True, 0),
+        open_reports=db.session.query(func.count(DonorReport.id)).filter_by(is_resolved=False).scalar(),
+    )
+    return render_template('admin/dashboard.html', stats=stats)
+
+def admin_panel_page(query, model, sortable, filters):
+    # ترتيب من جهة الخادم على عمود من القائمة المسموحة ثم المعرف، مع ترقيم بالمؤشر
+    sort = request.args.get('sort')
+    if sort not in sortable:
+        sort = 'created_at'
+    column = sortable[sort]
+    descending = request.args.get('order') != 'asc'
+    if isinstance(column.type, db.DateTime):
+        cursor_type = cursor_datetime
+    elif isinstance(column.type, db.Integer):
+        cursor_type = int
+    else:
+        cursor_type = str
+    per_page = page_size_arg('ADMIN_PAGE_SIZE', 'ADMIN_MAX_PAGE_SIZE')
     
-    return render_template('admin/dashboard.html', users=users, requests=blood_requests, reports=reports)
+    page = keyset_paginate(
+        query,
+        (column, model.id),
+        lambda item: (getattr(item, column.key), item.id),
+        after=decode_cursor(request.args.get('after'), cursor_type, int),
+        before=decode_cursor(request.args.get('before'), cursor_type, int),
+        per_page=per_page,
+        descending=descending,
+    )
+    params = dict(filters, sort=sort, order='desc' if descending else 'asc', per_page=per_page)
+    return page, params
+
+# مرشحات لوحات الإدارة مشتركة بين العرض المرقم والتصدير
+def admin_users_query():
+    filters = dict(
+        q=request.args.get('q') or None,
+        role=request.args.get('role') or None,
+        blood_type=request.args.get('blood_type') or None,
+    )
+    query = User.query
+    if filters['q']:
+        pattern = f"%{filters['q']}%"
+        query = query.filter(User.username.ilike(pattern) | User.email.ilike(pattern) | User.full_name.ilike(pattern))
+    if filters['role'] == 'admin':
+        query = query.filter_by(is_admin=True)
+    elif filters['role'] == 'donor':
+        query = query.filter_by(is_donor=True)
+    if filters['blood_type']:
+        query = query.filter_by(blood_type=filters['blood_type'])
+    return query, filters
+
+@app.route('/admin/panels/users')
+@admin_required
+def admin_users_panel():
+    query, filters = admin_users_query()
+    sortable = dict(created_at=User.created_at, full_name=User.full_name, username=User.username)
+    page, params = admin_panel_page(query, User, sortable, filters)
+    return render_template('admin/panels/users.html', users=page.items, page=page, params=params)
+
+def admin_requests_query():
+    filters = dict(
+        status=request.args.get('status') or None,
+        blood_type=request.args.get('blood_type') or None,
+        state=request.args.get('state') or None,
+    )
+    query = BloodRequest.query
+    if filters['status'] in ('active', 'fulfilled'):
+        query = query.filter_by(is_fulfilled=filters['status'] == 'fulfilled')
+    if filters['blood_type']:
+        query = query.filter_by(blood_type=filters['blood_type'])
+    if filters['state']:
+        query = query.filter_by(city=filters['state'])
+    return query, filters
+
+@app.route('/admin/panels/requests')
+@admin_required
+def admin_requests_panel():
+    query, filters = admin_requests_query()
+    # تحميل صاحب الطلب في نفس الاستعلام بدل استعلام لكل صف
+    query = query.options(joinedload(BloodRequest.requester))
+    sortable = dict(created_at=BloodRequest.created_at, units_needed=BloodRequest.units_needed)
+    page, params = admin_panel_page(query, BloodRequest, sortable, filters)
+    return render_template('admin/panels/requests.html', requests=page.items, page=page, params=params)
+
+def admin_reports_query():
+    filters = dict(
+        status=request.args.get('status') or None,
+        report_type=request.args.get('report_type') or None,
+    )
+    query = DonorReport.query
+    if filters['status'] in ('open', 'resolved'):
+        query = query.filter_by(is_resolved=filters['status'] == 'resolved')
+    if filters['report_type']:
+        query = query.filter_by(report_type=filters['report_type'])
+    return query, filters
+
+@app.route('/admin/panels/reports')
+@admin_required
+def admin_reports_panel():
+    query, filters = admin_reports_query()
+    query = query.options(joinedload(DonorReport.donor))
+    sortable = dict(created_at=DonorReport.created_at)
+    page, params = admin_panel_page(query, DonorReport, sortable, filters)
+    return render_template('admin/panels/reports.html', reports=page.items, page=page, params=params)
+
+# أعمدة التصدير لكل جدول (بدون كلمات المرور)، واسم صاحب الطلب أو المتبرع عبر join في نفس الاستعلام
+EXPORTS = {
+    'users': (admin_users_query, (
+        User.id, User.username, User.email, User.full_name, User.phone, User.blood_type,
+        User.city, User.district, User.is_donor, User.is_admin, User.created_at,
+    ), None),
+    'requests': (admin_requests_query, (
+        BloodRequest.id, BloodRequest.requester_id, User.username.label('requester'),
+        BloodRequest.blood_type, BloodRequest.units_needed, BloodRequest.hospital, BloodRequest.city,
+        BloodRequest.contact_phone, BloodRequest.details, BloodRequest.is_urgent,
+        BloodRequest.is_fulfilled, BloodRequest.created_at,
+    ), BloodRequest.requester),
+    'reports': (admin_reports_query, (
+        DonorReport.id, DonorReport.donor_id, User.username.label('donor'), DonorReport.report_type,
+        DonorReport.report_details, DonorReport.reporter_name, DonorReport.reporter_contact,
+        DonorReport.is_resolved, DonorReport.created_at,
+    ), DonorReport.donor),
+}
+EXPORT_BATCH_SIZE = 1000
+
+class _EchoWriter:
+    # csv.writer يعيد ما تعيده write، فيُنتج كل سطر كنص بدل كتابته في ملف
+    def write(self, value):
+        return value
+
+def export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+# الاسم والتفاصيل وبيانات المبلّغ تأتي من نماذج عامة؛ الخلية التي تبدأ بأحد هذه الرموز ينفذها
+# Excel كمعادلة (=HYPERLINK أو =cmd|...)، فتُسبق بـ ' لتُقرأ نصاً
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def csv_value(value):
+    value = export_value(value)
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def export_rows(query):
+    # جلسة الطلب تُغلق عند انتهاء الدالة وقبل إرسال الجسم، فيفتح query معاملة جديدة على نفس الجلسة
+    # لا يغلقها أحد؛ بدون close يبقى الاتصال "idle in transaction" في PostgreSQL ولا يعود للمجمع
+    try:
+        yield from query
+    finally:
+        query.session.close()
+
+def export_csv(rows, columns):
+    writer = csv.writer(_EchoWriter())
+    yield '\ufeff'  # BOM حتى يقرأ Excel النص العربي بترميز UTF-8
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([csv_value(value) for value in row])
+
+def export_json(rows, columns):
+    yield '['
+    separator = '\n'
+    for row in rows:
+        yield separator + json.dumps(dict(zip(columns, map(export_value, row))), ensure_ascii=False)
+        separator = ',\n'
+    yield '\n]\n'
+
+@app.route('/admin/export/<kind>.<fmt>')
+@admin_required
+def admin_export(kind, fmt):
+    if kind not in EXPORTS or fmt not in ('csv', 'json'):
+        abort(404)
+    build_query, export_columns, join = EXPORTS[kind]
+    query, filters = build_query()
+    query = query.with_entities(*export_columns)
+    if join is not None:
+        query = query.outerjoin(join)
+    # yield_per يقرأ الصفوف على دفعات بمؤشر من جهة الخادم بدل تحميل الجدول كاملاً
+    query = query.order_by(export_columns[0]).yield_per(EXPORT_BATCH_SIZE)
+    columns = [column['name'] for column in query.column_descriptions]
+    rows = export_rows(query)
+    body = export_csv(rows, columns) if fmt == 'csv' else export_json(rows, columns)
+    filename = f"{kind}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    return Response(
+        stream_with_context(body),
+        mimetype='text/csv' if fmt == 'csv' else 'application/json',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+@app.route('/admin/login_throttle')
+@admin_required
+def admin_login_throttle():
+    # عدادات هذا العامل فقط: المرفوضة قبل التجزئة مقابل التي تم التحقق منها
+    return jsonify(login_throttle.snapshot())
+
+def token_or_admin(token):
+    # Authorization: Bearer <token> للأدوات الآلية، وإلا جلسة مدير
+    authorization = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(authorization, f'Bearer {token}'):
+        return True
+    user = get_current_user()
+    return user is not None and user.is_admin
+
+@app.route('/admin/metrics')
+def admin_metrics():
+    if not app.config['METRICS_ENABLED']:
+        abort(404)
+    if not token_or_admin(app.config['METRICS_TOKEN']):
+        abort(403)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def login_throttle_metrics():
+    return [('login_attempts_total', 'counter', 'Login attempts by throttle outcome.',
+             [(dict(outcome=outcome), count) for outcome, count in sorted(login_throttle.snapshot().items())])]
+
+def job_queue_metrics():
+    return [('jobs', 'gauge', 'Background jobs by status.',
+             [(dict(status=status), count) for status, count in sorted(jobs.stats().items())])]
+
+metrics.collectors += [login_throttle_metrics, job_queue_metrics]
+
+def profiling_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not app.config['PROFILING_ENABLED']:
+            abort(404)
+        if not token_or_admin(app.config['PROFILING_TOKEN']):
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+if app.config['PROFILING_ENABLED']:
+    profiler.init_app(app, lambda: token_or_admin(app.config['PROFILING_TOKEN']))
+
+# عينات لمكدسات العامل الذي يستقبل الطلب لمدة seconds. بدون wait=1 تعمل في الخلفية ويُنزَّل
+# الملف لاحقاً من /admin/profiles؛ wait=1 يفيد فقط مع عمال متعددي الخيوط (gthread)
+@app.route('/admin/profile', methods=['POST'])
+@profiling_required
+def admin_profile():
+    fmt = request.args.get('format', 'speedscope')
+    if fmt not in FORMATS:
+        abort(400)
+    try:
+        thread, name = profiler.sample(
+            request.args.get('seconds', 10, type=float),
+            interval=request.args.get('interval', 0.01, type=float),
+            fmt=fmt,
+        )
+    except ProfilerBusy:
+        return jsonify(error='a sample is already running in this worker', pid=os.getpid()), 409
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if request.args.get('wait') == '1':
+        thread.join()
+        return send_from_directory(profiler.directory, name, as_attachment=True)
+    return jsonify(file=name, pid=os.getpid(), url=url_for('admin_profile_file', name=name)), 202
+
+@app.route('/admin/profiles')
+@profiling_required
+def admin_profiles():
+    return jsonify(profiles=profiler.files())
+
+# ملفات .prof تُعرض كملخص pstats مع format=text، أو تُنزَّل كما هي لـ snakeviz
+@app.route('/admin/profiles/<name>')
+@profiling_required
+def admin_profile_file(name):
+    if request.args.get('format') == 'text' and name.endswith('.prof'):
+        path = os.path.join(profiler.directory, os.path.basename(name))
+        if not os.path.isfile(path):
+            abort(404)
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in ('cumulative', 'tottime', 'calls'):
+            abort(400)
+        return Response(stats_text(path, sort=sort), mimetype='text/plain')
+    return send_from_directory(profiler.directory, name, as_attachment=True)
 
 # Add a route to mark reports as resolved
 @app.route('/admin/resolve_report/<int:report_id>')
@@ -439,7 +1279,7 @@ def resolve_report(report_id):
 @app.route('/admin/edit_request/<int:request_id>', methods=['GET', 'POST'])
 @admin_required
 def admin_edit_request(request_id):
-    blood_request = BloodRequest.query.get_or_404(request_id)
+    blood_request = BloodRequest.query.options(joinedload(BloodRequest.requester)).get_or_404(request_id)
     
     if request.method == 'POST':
         blood_request.blood_type = request.form.get('blood_type')
@@ -452,7 +1292,9 @@ def admin_edit_request(request_id):
         blood_request.is_fulfilled = 'is_fulfilled' in request.form
         
         try:
+            refresh_request_matches(blood_request.id)
             db.session.commit()
+            invalidate_home_requests()
             flash('تم تحديث طلب الدم بنجاح')
             return redirect(url_for('admin_dashboard'))
         except Exception as e:
@@ -467,8 +1309,10 @@ def admin_delete_request(request_id):
     blood_request = BloodRequest.query.get_or_404(request_id)
     
     try:
+        RequestDonorMatch.query.filter_by(request_id=blood_request.id).delete()
         db.session.delete(blood_request)
         db.session.commit()
+        invalidate_home_requests()
         flash('تم حذف طلب الدم بنجاح')
     except Exception as e:
         db.session.rollback()
@@ -483,6 +1327,7 @@ def admin_edit_user(user_id):
     user = User.query.get_or_404(user_id)
     
     if request.method == 'POST':
+        search_fields = donor_search_snapshot(user)
         # Update user data
         user.username = request.form.get('username')
         user.email = request.form.get('email')
@@ -497,10 +1342,15 @@ def admin_edit_user(user_id):
         # Update password if provided
         new_password = request.form.get('password')
         if new_password:
-            user.password = generate_password_hash(new_password)
+            user.password = hasher.hash(new_password)
         
+        search_changed = donor_search_snapshot(user) != search_fields
         try:
+            if search_changed:
+                refresh_donor_matches(user)
             db.session.commit()
+            if search_changed:
+                invalidate_donor_search()
             flash('تم تحديث بيانات المستخدم بنجاح')
             return redirect(url_for('admin_dashboard'))
         except Exception as e:
@@ -521,11 +1371,23 @@ def admin_delete_user(user_id):
     
     try:
         # Delete associated blood requests first
+        user_request_ids = db.session.query(BloodRequest.id).filter_by(requester_id=user.id)
+        matched = [request_id for request_id, in db.session.query(RequestDonorMatch.request_id).filter(
+            RequestDonorMatch.donor_id == user.id, ~RequestDonorMatch.request_id.in_(user_request_ids),
+        )]
+        RequestDonorMatch.query.filter(
+            (RequestDonorMatch.donor_id == user.id) | RequestDonorMatch.request_id.in_(user_request_ids)
+        ).delete(synchronize_session=False)
         BloodRequest.query.filter_by(requester_id=user.id).delete()
         
         # Delete the user
+        was_donor = user.is_donor
         db.session.delete(user)
+        refill_request_matches(matched)
         db.session.commit()
+        invalidate_home_requests()
+        if was_donor:
+            invalidate_donor_search()
         flash('تم حذف المستخدم بنجاح')
     except Exception as e:
         db.session.rollback()
@@ -533,6 +1395,211 @@ def admin_delete_user(user_id):
     
     return redirect(url_for('admin_dashboard'))
 
+# صفحات القوائم وأقصى عدد استعلامات لكل طلب (بما فيها جلب المستخدم في base.html)
+QUERY_BUDGET_PATH = os.path.join(app.root_path, 'query_budget.json')
+
+@app.cli.command('check-db')
+def check_db():
+    """Connect with the configured engine and report pool settings and tables."""
+    engine = db.engine
+    click.echo(f'url:     {engine.url.render_as_string(hide_password=True)}')
+    click.echo(f'dialect: {engine.dialect.name} ({engine.driver})')
+    click.echo(f'pool:    {engine.pool.status()}')
+    with engine.connect() as connection:
+        connection.execute(db.text('SELECT 1'))
+    tables = set(db.inspect(engine).get_table_names())
+    missing = [table.name for table in db.Model.metadata.sorted_tables if table.name not in tables]
+    if missing:
+        raise click.ClickException(f'missing tables: {", ".join(missing)} (run flask db upgrade)')
+    click.echo('ok')
+
+@app.cli.command('check-queries')
+@click.option('--budget', 'budget_path', default=QUERY_BUDGET_PATH, show_default=True,
+              type=click.Path(exists=True, dir_okay=False))
+def check_queries(budget_path):
+    """Fail if a listing view issues more SQL statements than budgeted, on the configured database.
+    
+    SQL time is reported alongside the count but not budgeted, since it depends on the machine.
+    """
+    from querycount import count_page_queries, load_budget
+    
+    budgets = load_budget(budget_path)
+    admin = User.query.filter_by(is_admin=True).first()
+    if admin is None:
+        raise click.ClickException('check-queries needs at least one admin user')
+    
+    client = app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['user_id'] = admin.id
+    failures = 0
+    for url, limit in budgets.items():
+        counter = count_page_queries(sys.modules[__name__], client, url)
+        sql_ms = counter.seconds * 1000
+        if counter.count > limit:
+            failures += 1
+            click.echo(f'FAIL  {url} issued {counter.count} queries (budget {limit}) in {sql_ms:.1f} ms:', err=True)
+            click.echo('\n'.join(counter.statements), err=True)
+        else:
+            click.echo(f'ok    {url}: {counter.count}/{limit} queries, {sql_ms:.1f} ms SQL')
+    if failures:
+        raise SystemExit(1)
+
+@app.cli.command('build-assets')
+def build_assets():
+    """Minify, fingerprint and precompress static files into static/dist."""
+    from assets import build
+    
+    for rel, hashed, original, minified, variants in build(app.static_folder):
+        sizes = ' '.join(f'{encoding} {size}' for encoding, size in variants.items())
+        click.echo(f'{rel} -> {hashed}: {original} -> {minified} {sizes}'.rstrip())
+    # ملفات البناء السابق تبقى، فتعمل صفحات العمال الحاليين حتى إعادة تشغيلهم
+    click.echo('restart the app to serve the new manifest')
+
+@app.cli.command('slow-queries')
+@click.argument('log_file', type=click.File(encoding='utf-8'), required=False)
+@click.option('--top', default=10, show_default=True)
+def slow_queries(log_file, top):
+    """Summarize the slow-query log by endpoint and statement, with the plan of the slowest run."""
+    from slowlog import summarize
+    
+    if log_file is None:
+        if not app.config['SLOW_QUERY_LOG']:
+            raise click.ClickException('pass a log file or set SLOW_QUERY_LOG')
+        log_file = open(app.config['SLOW_QUERY_LOG'], encoding='utf-8')
+    with log_file:
+        groups = summarize(log_file)
+    for (endpoint, statement), group in groups[:top]:
+        click.echo(f"{group['count']}x total {group['total_ms']:.1f}ms max {group['max_ms']:.1f}ms  [{endpoint}]")
+        click.echo('  ' + ' '.join(statement.split()))
+        for line in group['plan'] or ():
+            click.echo(f'    {line}')
+
+@app.cli.command('rebuild-matches')
+def rebuild_matches():
+    """Recompute the request_donor_match table from scratch."""
+    RequestDonorMatch.query.delete()
+    count = insert_donor_matches()
+    db.session.commit()
+    click.echo(f'{count} matches')
+
+# أعمدة ملف استيراد المتبرعين؛ password اختياري
+IMPORT_DONOR_COLUMNS = ('username', 'email', 'full_name', 'phone', 'blood_type', 'wilaya', 'daira')
+# تجزئة غير صالحة: لا يمكن الدخول بها حتى يعين المدير كلمة مرور من admin_edit_user
+UNUSABLE_PASSWORD = '!'
+
+def donor_row_error(row):
+    for column in IMPORT_DONOR_COLUMNS:
+        if not row.get(column):
+            return f'missing {column}'
+    if row['blood_type'] not in BLOOD_COMPATIBILITY:
+        return f'unknown blood type {row["blood_type"]!r}'
+    if find_state(row['wilaya']) is None:
+        return f'unknown wilaya {row["wilaya"]!r}'
+    if not is_daira(find_state(row['wilaya']), row['daira']):
+        return f'daira {row["daira"]!r} is not in {find_state(row["wilaya"])}'
+    return None
+
+def import_donor_batch(rows, import_hasher):
+    """يدرج الصفوف الصالحة التي لا يوجد اسم مستخدمها أو بريدها، ويعيد عدد المدرجين."""
+    taken = db.session.query(User.username, User.email).filter(or_(
+        User.username.in_([row['username'] for row in rows]),
+        User.email.in_([row['email'] for row in rows]),
+    )).all()
+    taken_usernames = {username for username, _ in taken}
+    taken_emails = {email for _, email in taken}
+    rows = [row for row in rows if row['username'] not in taken_usernames and row['email'] not in taken_emails]
+    
+    with_password = [row for row in rows if row.get('password')]
+    for row, pwhash in zip(with_password, import_hasher.hash_many([row['password'] for row in with_password])):
+        row['pwhash'] = pwhash
+    db.session.bulk_insert_mappings(User, [{
+        'username': row['username'],
+        'email': row['email'],
+        'password': row.get('pwhash', UNUSABLE_PASSWORD),
+        'full_name': row['full_name'],
+        'phone': row['phone'],
+        'blood_type': row['blood_type'],
+        'city': find_state(row['wilaya']),
+        'district': row['daira'],
+        'is_donor': True,
+    } for row in rows])
+    insert_donor_matches(User.username.in_([row['username'] for row in rows]))
+    return len(rows)
+
+@app.cli.command('import-donors')
+@click.argument('csv_file', type=click.File(encoding='utf-8-sig'))
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--hash-workers', default=os.cpu_count() or 1, show_default=True,
+              help='Threads hashing the optional password column.')
+@click.option('--dry-run', is_flag=True, help='Validate and count without committing.')
+def import_donors(csv_file, batch_size, hash_workers, dry_run):
+    """Import donors from a CSV file (wilaya may be "16 - الجزائر" or 16)."""
+    reader = csv.DictReader(csv_file)
+    missing = [column for column in IMPORT_DONOR_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise click.ClickException(f'missing columns: {", ".join(missing)}')
+    
+    import_hasher = PasswordHasher(app.config['PASSWORD_HASH_METHOD'], max_workers=hash_workers)
+    seen_usernames, seen_emails = set(), set()
+    counts = dict(read=0, imported=0, invalid=0, duplicate=0)
+    started = time.perf_counter()
+    
+    def flush(batch):
+        imported = import_donor_batch(batch, import_hasher) if batch else 0
+        counts['imported'] += imported
+        counts['duplicate'] += len(batch) - imported
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        elapsed = time.perf_counter() - started
+        click.echo(f'{counts["read"]} rows read, {counts["imported"]} imported, '
+                   f'{counts["read"] / elapsed:.0f} rows/s')
+    
+    batch = []
+    for line, row in enumerate(reader, start=2):
+        counts['read'] += 1
+        row = {key: (value or '').strip() for key, value in row.items() if key}
+        error = donor_row_error(row)
+        if error:
+            counts['invalid'] += 1
+            click.echo(f'line {line}: {error}', err=True)
+            continue
+        # التكرار داخل الملف نفسه؛ التكرار مع قاعدة البيانات يُفحص لكل دفعة
+        if row['username'] in seen_usernames or row['email'] in seen_emails:
+            counts['duplicate'] += 1
+            continue
+        seen_usernames.add(row['username'])
+        seen_emails.add(row['email'])
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+    
+    if counts['imported'] and not dry_run:
+        invalidate_donor_search()
+    click.echo(', '.join(f'{key}: {value}' for key, value in counts.items()))
+
+@app.cli.group('jobs')
+def jobs_cli():
+    """Background job queue."""
+
+@jobs_cli.command('work')
+@click.option('--until-idle', is_flag=True, help='Exit once no job is ready.')
+def jobs_work(until_idle):
+    """Run a job worker in the foreground."""
+    jobs.work(f'cli-{os.getpid()}', until_idle=until_idle)
+
+@jobs_cli.command('status')
+@click.option('--purge-days', type=int, default=None, help='Delete finished jobs older than this.')
+def jobs_status(purge_days):
+    """Print job counts by status."""
+    if purge_days is not None:
+        click.echo(f'purged:  {jobs.purge(purge_days * 86400)}')
+    for status, count in sorted(jobs.stats().items()):
+        click.echo(f'{status}: {count}')
+
 # تعديل الجزء الأخير من الملف
 if __name__ == '__main__':
     # إنشاء قاعدة البيانات إذا لم تكن موجودة
@@ -545,7 +1612,7 @@ if __name__ == '__main__':
             admin_user = User(
                 username='admin',
                 email='admin@tabaro3.com',
-                password=generate_password_hash('admin123'),
+                password=hasher.hash('admin123'),
                 full_name='مدير النظام',
                 phone='0000000000',
                 is_admin=True,
@@ -561,6 +1628,8 @@ if __name__ == '__main__':
             print("كلمة المرور: admin123")
     
     # تشغيل التطبيق
+    app.debug = True
+    start_job_workers()
     app.run(debug=True, host='0.0.0.0')
 
 # تأكد من أن المتغير app متاح للوصول إليه من wfastcgi
@@ -579,7 +1648,7 @@ def app_function(request):
             admin_user = User(
                 username='admin',
                 email='admin@tabaro3.com',
-                password=generate_password_hash('admin123'),
+                password=hasher.hash('admin123'),
                 full_name='مدير النظام',
                 phone='0000000000',
                 is_admin=True,
@@ -0,0 +1,153 @@
+"""بناء الملفات الثابتة للنشر: تصغير CSS وJS وSVG، أسماء ببصمة المحتوى، ونسخ .gz/.br مضغوطة مسبقاً.
+
+    flask build-assets   # يكتب static/dist/ وstatic/dist/manifest.json
+
+بعد البناء يعيد url_for('static', filename='css/custom.css') رابط النسخة ذات البصمة
+(dist/css/custom.3f2a9c1b07.css)، وتُقدَّم بترويسة immutable لأن محتوى الاسم الواحد لا يتغير.
+بدون manifest تُقدَّم الملفات الأصلية كما هي.
+
+العمال الحاليون يحتفظون بـ manifest الذي قرؤوه عند التشغيل حتى إعادة تشغيلهم، لذلك لا يحذف البناء
+ملفات البناء السابق: تُكتب الملفات الجديدة أولاً ثم يُستبدل manifest، ويُحذف فقط ما لا يذكره
+manifest الجديد ولا السابق.
+"""
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json'}
+
+# النصوص بين علامات التنصيص تبقى كما هي، والتصغير يطبق على ما بينها فقط
+_STRINGS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def _outside_strings(source, fn):
+    parts = _STRINGS.split(source)
+    return ''.join(part if i % 2 else fn(part) for i, part in enumerate(parts))
+
+
+def _minify_css_code(code):
+    code = re.sub(r'\s+', ' ', code)
+    code = re.sub(r'\s*([{};,>])\s*', r'\1', code)
+    code = re.sub(r':\s+', ':', code)
+    return code.replace(';}', '}')
+
+
+def minify_css(source):
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    return _outside_strings(source, _minify_css_code).strip()
+
+
+def minify_js(source):
+    # تصغير محافظ: إزالة المسافات البادئة والأسطر الفارغة وأسطر التعليق الكاملة فقط.
+    # القوالب النصية (`...`) قد تمتد على عدة أسطر، فتُترك الملفات التي تحتويها كما هي
+    if '`' in source:
+        return source
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def minify_svg(source):
+    source = re.sub(r'<!--.*?-->', '', source, flags=re.S)
+    source = re.sub(r'>\s+<', '><', source)
+    return re.sub(r'\s+', ' ', source).strip()
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js, '.svg': minify_svg}
+
+
+def compress(data):
+    """{Content-Encoding: data مضغوطة} لملفات البناء ولبيانات الولايات في regions.py."""
+    variants = {'gzip': gzip.compress(data, 9, mtime=0)}
+    try:
+        import brotli  # في requirements.txt، ويبقى البناء ممكناً بدونه (نسخ gzip فقط) حيث لا تتوفر حزمته
+    except ImportError:
+        return variants
+    variants['br'] = brotli.compress(data, quality=11)
+    return variants
+
+
+SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+
+def _sources(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        rel_root = os.path.relpath(root, static_folder).replace(os.sep, '/')
+        if rel_root == DIST or rel_root.startswith(DIST + '/'):
+            continue
+        for name in files:
+            yield name if rel_root == '.' else f'{rel_root}/{name}'
+
+
+def _rewrite_css_urls(source, rel, manifest):
+    # روابط url() النسبية داخل CSS تشير إلى النسخ ذات البصمة
+    def replace(match):
+        quote, url = match.groups()
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(rel), url))
+        if url.startswith(('data:', 'http:', 'https:', '/')) or target not in manifest:
+            return match.group(0)
+        hashed = posixpath.relpath(manifest[target], posixpath.dirname(f'{DIST}/{rel}'))
+        return f'url({quote}{hashed}{quote})'
+    return _CSS_URL.sub(replace, source)
+
+
+def _write(path, data):
+    # كتابة ثم إعادة تسمية، فلا يقرأ عامل يخدم نفس الاسم ملفاً نصف مكتوب
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def _prune(out, keep):
+    for root, dirs, files in os.walk(out):
+        for name in files:
+            rel = os.path.relpath(os.path.join(root, name), os.path.dirname(out)).replace(os.sep, '/')
+            if rel.removesuffix('.gz').removesuffix('.br') not in keep and name != MANIFEST:
+                os.remove(os.path.join(root, name))
+
+
+def build(static_folder):
+    """يعيد صفاً لكل ملف: (الاسم الأصلي، الاسم ذو البصمة، الحجم الأصلي، بعد التصغير، أحجام المضغوطة)."""
+    out = os.path.join(static_folder, DIST)
+    previous = load_manifest(static_folder)[1]
+    assets, encodings, report = {}, {}, []
+    # CSS أخيراً حتى تكون الصور والخطوط في manifest قبل إعادة كتابة روابطها
+    for rel in sorted(_sources(static_folder), key=lambda rel: (rel.endswith('.css'), rel)):
+        with open(os.path.join(static_folder, rel), 'rb') as f:
+            original = f.read()
+        root, ext = posixpath.splitext(rel)
+        data = original
+        if ext in MINIFIERS:
+            source = original.decode('utf-8')
+            if ext == '.css':
+                source = _rewrite_css_urls(source, rel, assets)
+            data = MINIFIERS[ext](source).encode('utf-8')
+        hashed = f'{DIST}/{root}.{hashlib.sha256(data).hexdigest()[:10]}{ext}'
+        path = os.path.join(static_folder, hashed)
+        _write(path, data)
+        variants = compress(data) if ext in COMPRESSIBLE else {}
+        for encoding, payload in variants.items():
+            _write(path + SUFFIXES[encoding], payload)
+        assets[rel] = hashed
+        encodings[hashed] = [encoding for encoding in ('br', 'gzip') if encoding in variants]
+        report.append((rel, hashed, len(original), len(data), {e: len(p) for e, p in variants.items()}))
+    manifest = json.dumps({'assets': assets, 'encodings': encodings}, indent=1, sort_keys=True)
+    _write(os.path.join(out, MANIFEST), manifest.encode('utf-8'))
+    _prune(out, set(encodings) | set(previous))
+    return report
+
+
+def load_manifest(static_folder):
+    """(الاسم الأصلي -> ذو البصمة، ذو البصمة -> الترميزات المتاحة بترتيب الأفضلية)، فارغان قبل البناء."""
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}, {}
+    return manifest['assets'], manifest['encodings']
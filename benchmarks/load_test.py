@@ -0,0 +1,215 @@
+"""قياس زمن الاستجابة (p50/p95/p99) والإنتاجية لـ /، /search، /requests، /login و/admin_dashboard.
+
+    python benchmarks/synthetic.py --scale 100k --database /tmp/bench-100k.db
+    python benchmarks/load_test.py --database /tmp/bench-100k.db --mode client --seconds 20
+    python benchmarks/load_test.py --database /tmp/bench-100k.db --mode http --processes 8
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --processes 8
+
+client: test_client داخل عملية واحدة بلا شبكة، لقياس كلفة التطبيق وحدها.
+http: عمليات منفصلة، لكل منها اتصال keep-alive، ترسل طلبات HTTP حقيقية إلى خادم werkzeug
+متعدد الخيوط يُشغَّل هنا على القاعدة المولدة، أو إلى خادم قائم عبر --url (gunicorn مثلاً،
+وعندها يجب رفع حدود LOGIN_RATE_* يدوياً). السيناريوهات بالتناوب، ومعاملاتها من seed.
+"""
+import argparse
+import http.client
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import ADMIN_USERNAME, BLOOD_TYPES, PASSWORD, REGIONS, STATES, benchmark_environment  # noqa: E402
+
+SCENARIOS = ('home', 'search', 'requests', 'login', 'admin_dashboard')
+# المستخدمون donor0..donorN موجودون في كل الأحجام (10k على الأقل)
+LOGIN_USERS = 10000
+
+
+def scenario_request(name, rng):
+    """(method, path, form) لطلب واحد من السيناريو."""
+    if name == 'home':
+        return 'GET', '/', None
+    if name == 'search':
+        state = rng.choice(STATES)
+        query = {'blood_type': rng.choice(BLOOD_TYPES), 'state': state}
+        if rng.random() < 0.3:
+            query['city'] = rng.choice(REGIONS[state])
+        if rng.random() < 0.3:
+            query['match'] = 'compatible'
+        return 'GET', '/search?' + urlencode(query), None
+    if name == 'requests':
+        query = {'state': rng.choice(STATES)} if rng.random() < 0.5 else {}
+        return 'GET', '/requests' + ('?' + urlencode(query) if query else ''), None
+    if name == 'login':
+        return 'POST', '/login', {'username': f'donor{rng.randrange(LOGIN_USERS)}', 'password': PASSWORD}
+    return 'GET', '/admin_dashboard', None
+
+
+def drive_client(args):
+    benchmark_environment(args.database)
+    from app import app
+
+    anonymous, logins, admin = app.test_client(), app.test_client(), app.test_client()
+    admin.post('/login', data={'username': ADMIN_USERNAME, 'password': PASSWORD})
+    clients = {'login': logins, 'admin_dashboard': admin}
+    rng = random.Random(args.seed)
+    latencies, errors = defaultdict(list), defaultdict(int)
+    deadline = time.perf_counter() + args.seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        name = args.scenarios[i % len(args.scenarios)]
+        i += 1
+        method, path, form = scenario_request(name, rng)
+        client = clients.get(name, anonymous)
+        started = time.perf_counter()
+        response = client.open(path, method=method, data=form)
+        latencies[name].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            errors[name] += 1
+    return latencies, errors
+
+
+def serve(database, ready):
+    benchmark_environment(database)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # بلا سطر لكل طلب
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app import app
+
+    WSGIRequestHandler.protocol_version = 'HTTP/1.1'  # keep-alive لاتصالات المحرك
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    ready.put(server.server_port)
+    server.serve_forever()
+
+
+class Connection:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def request(self, method, path, form=None, cookie=None):
+        headers = {'Cookie': cookie} if cookie else {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        for attempt in (1, 2):
+            try:
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                response.read()
+                return response
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # الخادم أغلق الاتصال بين طلبين؛ نعيد فتحه مرة واحدة
+                self.connection.close()
+                if attempt == 2:
+                    raise
+
+
+def admin_cookie(connection):
+    response = connection.request('POST', '/login', {'username': ADMIN_USERNAME, 'password': PASSWORD})
+    cookie = response.getheader('Set-Cookie', '')
+    return cookie.split(';', 1)[0]
+
+
+def drive_http(url, scenarios, seconds, seed, results):
+    connection = Connection(url)
+    cookie = admin_cookie(connection)
+    rng = random.Random(seed)
+    latencies, errors = defaultdict(list), defaultdict(int)
+    deadline = time.perf_counter() + seconds
+    i = seed  # كل عملية تبدأ من سيناريو مختلف
+    while time.perf_counter() < deadline:
+        name = scenarios[i % len(scenarios)]
+        i += 1
+        method, path, form = scenario_request(name, rng)
+        started = time.perf_counter()
+        try:
+            response = connection.request(method, path, form, cookie if name == 'admin_dashboard' else None)
+            status = response.status
+        except OSError:
+            status = 599
+        latencies[name].append((time.perf_counter() - started) * 1000)
+        if status >= 400:
+            errors[name] += 1
+    results.put((dict(latencies), dict(errors)))
+
+
+def run_http(args):
+    ctx = multiprocessing.get_context('spawn')
+    server = None
+    url = args.url
+    if url is None:
+        ready = ctx.Queue()
+        server = ctx.Process(target=serve, args=(args.database, ready), daemon=True)
+        server.start()
+        url = f'http://127.0.0.1:{ready.get(timeout=120)}'
+    try:
+        results = ctx.Queue()
+        drivers = [
+            ctx.Process(target=drive_http, args=(url, args.scenarios, args.seconds, args.seed + i, results))
+            for i in range(args.processes)
+        ]
+        for driver in drivers:
+            driver.start()
+        latencies, errors = defaultdict(list), defaultdict(int)
+        for _ in drivers:
+            driver_latencies, driver_errors = results.get()
+            for name, values in driver_latencies.items():
+                latencies[name].extend(values)
+            for name, count in driver_errors.items():
+                errors[name] += count
+        for driver in drivers:
+            driver.join()
+        return latencies, errors
+    finally:
+        if server is not None:
+            server.terminate()
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(label, latencies, errors, seconds):
+    total = sum(len(values) for values in latencies.values())
+    print(f'{label}: {total / seconds:.0f} req/s over {seconds:g}s')
+    print(f'  {"":16}{"requests":>9}{"errors":>8}{"req/s":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}')
+    for name in SCENARIOS:
+        values = sorted(latencies.get(name, ()))
+        if not values:
+            continue
+        print(f'  {name:16}{len(values):>9}{errors.get(name, 0):>8}{len(values) / seconds:>8.0f}'
+              f'{percentile(values, 0.50):>9.1f}{percentile(values, 0.95):>9.1f}{percentile(values, 0.99):>9.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', help='Database built by synthetic.py (file or URL).')
+    parser.add_argument('--url', help='Drive an already running server instead of starting one.')
+    parser.add_argument('--mode', choices=('client', 'http', 'both'), default='both')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    args.scenarios = [name for name in args.scenarios.split(',') if name]
+    if not args.database and (args.url is None or args.mode != 'http'):
+        parser.error('--database is required unless --mode http --url is given')
+
+    if args.mode in ('client', 'both'):
+        latencies, errors = drive_client(args)
+        report('test client', latencies, errors, args.seconds)
+    if args.mode in ('http', 'both'):
+        latencies, errors = run_http(args)
+        report(f'http, {args.processes} processes', latencies, errors, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""قياس إنتاجية /login تحت ضغط، مع وبدون مجمع التجزئة (PASSWORD_HASH_WORKERS).
+
+    python benchmarks/login_throughput.py --login-threads 8 --browse-threads 4 --seconds 10
+
+في كل وضع تعمل خيوط تسجيل دخول متواصلة بجانب خيوط تتصفح /requests داخل نفس
+العملية، كما في عامل gunicorn بخيوط. يُقاس عدد تسجيلات الدخول في الثانية وزمن
+الاستجابة (p50/p95) لكل من /login و/requests.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import benchmark_environment  # noqa: E402
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_mode(workers, args, results):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    benchmark_environment(path)
+    os.environ['PASSWORD_HASH_WORKERS'] = str(workers)
+    os.environ['PASSWORD_HASH_METHOD'] = args.method
+    sys.path.insert(0, ROOT)
+    from app import app, db, hasher, User
+
+    with app.app_context():
+        db.create_all()
+        password = hasher.hash('benchmark')
+        db.session.execute(User.__table__.insert(), [
+            dict(username=f'user{i}', email=f'user{i}@example.com', password=password,
+                 full_name=f'User {i}', phone='0550000000', blood_type='O+',
+                 city='16 - الجزائر', district='باب الوادي', is_donor=True, is_admin=False)
+            for i in range(args.users)
+        ])
+        db.session.commit()
+
+    timings = {'login': [], 'browse': []}
+    rejected = []
+    deadline = time.perf_counter() + args.seconds
+
+    def login_loop(n):
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = client.post('/login', data={'username': f'user{n % args.users}', 'password': 'benchmark'})
+            if response.status_code == 503:
+                rejected.append(1)
+            else:
+                timings['login'].append(time.perf_counter() - started)
+            n += args.login_threads
+
+    def browse_loop():
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            client.get('/requests')
+            timings['browse'].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=login_loop, args=(i,)) for i in range(args.login_threads)]
+    threads += [threading.Thread(target=browse_loop) for _ in range(args.browse_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    os.remove(path)
+    results.put((
+        len(timings['login']) / args.seconds,
+        len(rejected),
+        percentile(timings['login'], 0.5) * 1000, percentile(timings['login'], 0.95) * 1000,
+        len(timings['browse']) / args.seconds,
+        percentile(timings['browse'], 0.5) * 1000, percentile(timings['browse'], 0.95) * 1000,
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--browse-threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2])
+    parser.add_argument('--method', default='pbkdf2:sha256:260000')
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    print(f'{args.login_threads} login threads, {args.browse_threads} browse threads, {args.method}')
+    print(f'{"workers":>8}{"logins/s":>10}{"503s":>6}{"login p50":>11}{"login p95":>11}'
+          f'{"browse/s":>10}{"browse p50":>12}{"browse p95":>12}')
+    for workers in args.workers:
+        results = ctx.Queue()
+        process = ctx.Process(target=run_mode, args=(workers, args, results))
+        process.start()
+        row = results.get()
+        process.join()
+        label = 'inline' if workers == 0 else str(workers)
+        print(f'{label:>8}{row[0]:>10.1f}{row[1]:>6}{row[2]:>9.0f}ms{row[3]:>9.0f}ms'
+              f'{row[4]:>10.1f}{row[5]:>10.0f}ms{row[6]:>10.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
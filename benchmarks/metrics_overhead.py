@@ -0,0 +1,60 @@
+"""قياس كلفة RequestMetrics على زمن الطلب، مع وبدون METRICS_ENABLED.
+
+    python benchmarks/metrics_overhead.py --requests 3000
+
+كل وضع عملية منفصلة تستورد app بقاعدة مؤقتة (لأن METRICS_ENABLED يُقرأ عند الاستيراد)،
+ثم تطلب /، /requests وصفحة بحث عبر test_client بالتناوب.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = (('disabled', '0'), ('enabled', '1'))
+
+
+def run(enabled, args, results):
+    directory = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{directory}/bench.db'
+    os.environ['JOB_QUEUE_PATH'] = f'{directory}/jobs.db'
+    os.environ['METRICS_ENABLED'] = enabled
+    sys.path.insert(0, ROOT)
+    import app
+    from synthetic import STATES, populate_users
+
+    with app.app.app_context():
+        app.db.create_all()
+        populate_users(args.donors, args.seed)
+    urls = ['/', '/requests', f'/search?blood_type=O%2B&state={STATES[0]}']
+    client = app.app.test_client()
+    for url in urls:
+        client.get(url)
+    started = time.perf_counter()
+    for i in range(args.requests):
+        client.get(urls[i % len(urls)])
+    results.put(time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--donors', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    print(f'{"":10}{"req/s":>10}{"us/req":>10}')
+    for label, enabled in MODES:
+        results = ctx.Queue()
+        process = ctx.Process(target=run, args=(enabled, args, results))
+        process.start()
+        elapsed = results.get()
+        process.join()
+        print(f'{label:10}{args.requests / elapsed:>10.0f}{elapsed / args.requests * 1e6:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""قياس زمن البحث عن المتبرعين قبل وبعد فهارس ix_user_donor_*.
+
+    python benchmarks/search_indexes.py --donors 500000
+
+ينشئ قاعدة SQLite مؤقتة ويملؤها بمتبرعين اصطناعيين ثم يقيس donor_search_query()
+بنفس تركيبات الفلاتر التي يرسلها نموذج /search.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import BLOOD_TYPES, REGIONS, STATES, benchmark_environment, populate_users  # noqa: E402
+
+# القاعدة المؤقتة وطابور المهام المؤقت قبل استيراد app، لأن الرابط والعمال يُقرآن عند الاستيراد
+_fd, DATABASE = tempfile.mkstemp(suffix='.db')
+os.close(_fd)
+benchmark_environment(DATABASE)
+
+from app import app, db, User, donor_search_query  # noqa: E402
+
+INDEX_NAMES = ['ix_user_donor_search', 'ix_user_donor_location']
+
+
+def workload(seed, size):
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(size):
+        state = rng.choice(STATES)
+        cases.append((
+            rng.choice(BLOOD_TYPES + [None]),
+            state,
+            rng.choice(list(REGIONS[state]) + [None]),
+        ))
+    return cases
+
+
+def run(cases, repeat):
+    timings = []
+    for _ in range(repeat):
+        for blood_type, state, city in cases:
+            started = time.perf_counter()
+            donor_search_query(blood_type, state, city).all()
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[int(len(timings) * 0.95) - 1],
+        'mean': statistics.fmean(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--donors', type=int, default=500000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    cases = workload(args.seed, args.queries)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            for name in INDEX_NAMES:
+                db.session.execute(db.text(f'DROP INDEX {name}'))
+            started = time.perf_counter()
+            populate_users(args.donors, args.seed)
+            print(f'populated {args.donors} donors in {time.perf_counter() - started:.1f}s')
+
+            before = run(cases, args.repeat)
+            for index in User.__table__.indexes:
+                index.create(db.engine)
+            db.session.execute(db.text('ANALYZE'))
+            db.session.commit()
+            after = run(cases, args.repeat)
+
+            print(f'{"":8}{"p50 ms":>10}{"p95 ms":>10}{"mean ms":>10}')
+            for label, result in (('before', before), ('after', after)):
+                print(f'{label:8}{result["p50"]:>10.2f}{result["p95"]:>10.2f}{result["mean"]:>10.2f}')
+            db.session.remove()
+    finally:
+        os.remove(DATABASE)
+
+
+if __name__ == '__main__':
+    main()
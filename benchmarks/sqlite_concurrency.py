@@ -0,0 +1,122 @@
+"""قياس إنتاجية القراءة والكتابة المتزامنة على SQLite مع وبدون set_sqlite_pragmas.
+
+    python benchmarks/sqlite_concurrency.py --readers 6 --writers 2 --seconds 10
+
+كل عامل عملية منفصلة (مثل عمال gunicorn) تستورد app بقاعدة مؤقتة خاصة بكل وضع:
+القراء ينفذون استعلامات home() وsearch()، والكتّاب يضيفون طلبات دم مع commit لكل طلب.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = (('rollback journal', '0'), ('WAL + pragmas', '1'))
+
+
+def import_app(path, pragmas):
+    from synthetic import benchmark_environment
+
+    # بلا عمال مهام في كل عملية، حتى لا يضيف استطلاع الطابور حملاً على القياس
+    benchmark_environment(path)
+    os.environ['SQLITE_PRAGMAS'] = pragmas
+    sys.path.insert(0, ROOT)
+    import app
+    return app
+
+
+def prepare(path, pragmas, donors, seed):
+    app = import_app(path, pragmas)
+    from synthetic import populate_users
+
+    with app.app.app_context():
+        app.db.create_all()
+        populate_users(donors, seed)
+
+
+def worker(role, path, pragmas, seconds, seed, results):
+    app = import_app(path, pragmas)
+    from sqlalchemy.exc import OperationalError
+    from synthetic import BLOOD_TYPES, STATES
+
+    rng = random.Random(seed)
+    states = STATES
+    ops = errors = 0
+    with app.app.app_context():
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            try:
+                if role == 'reader':
+                    app.BloodRequest.query.filter_by(is_fulfilled=False) \
+                        .order_by(app.BloodRequest.created_at.desc()).limit(10).all()
+                    app.donor_search_query(rng.choice(BLOOD_TYPES), rng.choice(states)) \
+                        .order_by(app.User.id).limit(25).all()
+                else:
+                    app.db.session.add(app.BloodRequest(
+                        requester_id=rng.randrange(1, 1000), blood_type=rng.choice(BLOOD_TYPES),
+                        units_needed=2, hospital='Bench', city=rng.choice(states),
+                        contact_phone='0550000000', is_urgent=rng.random() < 0.2,
+                    ))
+                    app.db.session.commit()
+                ops += 1
+            except OperationalError:
+                app.db.session.rollback()
+                errors += 1
+            app.db.session.remove()
+    results.put((role, ops, errors))
+
+
+def run_mode(pragmas, args):
+    ctx = multiprocessing.get_context('spawn')
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        setup = ctx.Process(target=prepare, args=(path, pragmas, args.donors, args.seed))
+        setup.start()
+        setup.join()
+
+        results = ctx.Queue()
+        roles = ['reader'] * args.readers + ['writer'] * args.writers
+        processes = [
+            ctx.Process(target=worker, args=(role, path, pragmas, args.seconds, args.seed + i, results))
+            for i, role in enumerate(roles)
+        ]
+        for process in processes:
+            process.start()
+        totals = {'reader': [0, 0], 'writer': [0, 0]}
+        for _ in processes:
+            role, ops, errors = results.get()
+            totals[role][0] += ops
+            totals[role][1] += errors
+        for process in processes:
+            process.join()
+        return totals
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=6)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--donors', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f'{args.readers} readers, {args.writers} writers, {args.seconds:g}s per mode')
+    print(f'{"":18}{"reads/s":>10}{"writes/s":>10}{"errors":>8}')
+    for label, pragmas in MODES:
+        totals = run_mode(pragmas, args)
+        reads, writes = totals['reader'][0], totals['writer'][0]
+        errors = totals['reader'][1] + totals['writer'][1]
+        print(f'{label:18}{reads / args.seconds:>10.0f}{writes / args.seconds:>10.0f}{errors:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""بيانات اصطناعية قابلة للتكرار (seed) لقياس الأداء: مستخدمون وطلبات دم وبلاغات بأحجام 10k/100k/1m.
+
+    python benchmarks/synthetic.py --scale 100k --database /tmp/bench-100k.db
+
+توزيع الولايات متناسب مع عدد دوائرها في algeria_cities.js (تقريب لعدد السكان) والدائرة
+بالتساوي داخلها، وفصائل الدم بنسب تقريبية لسكان الجزائر. لكل 20 مستخدماً طلب دم ولكل
+100 بلاغ. كلمة مرور الجميع PASSWORD، والمدير ADMIN_USERNAME. جدول request_donor_match يبنى
+كما يبنيه flask rebuild-matches إلا مع --no-matches (حجمه يتضاعف مع المستخدمين والطلبات معاً).
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from regions import REGIONS  # noqa: E402
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+BLOOD_TYPES = ['O+', 'A+', 'B+', 'AB+', 'O-', 'A-', 'B-', 'AB-']
+BLOOD_WEIGHTS = [40, 30, 15, 5, 4, 3, 2, 1]
+REPORT_TYPES = ['incorrect_info', 'unavailable', 'inappropriate', 'other']
+PASSWORD = 'benchmark'
+ADMIN_USERNAME = 'bench-admin'
+BATCH_SIZE = 10000
+# كل التواريخ نسبية لهذا اليوم حتى تتطابق القواعد المولدة بنفس seed
+EPOCH = datetime(2026, 1, 1)
+
+STATES = list(REGIONS)
+STATE_WEIGHTS = [len(REGIONS[state]) for state in STATES]
+
+
+def benchmark_environment(database):
+    """إعداد البيئة قبل استيراد app.py في أدوات القياس.
+
+    database ملف SQLite أو رابط قاعدة. طابور المهام في مجلد مؤقت بلا عمال، فلا يُكتب في طابور
+    التطبيق الحقيقي، وحدود throttle.py مرفوعة لأن كل الطلبات من نفس العنوان، حتى لا يُقاس الرفض
+    بدل التطبيق.
+    """
+    os.environ['DATABASE_URL'] = database if '://' in database else f'sqlite:///{os.path.abspath(database)}'
+    os.environ['JOB_QUEUE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='tabaro3-bench-'), 'jobs.db')
+    os.environ['JOB_WORKERS'] = '0'
+    for name in ('LOGIN_RATE_IP_CAPACITY', 'LOGIN_RATE_USERNAME_CAPACITY'):
+        os.environ[name] = '1000000000'
+
+
+def _insert(table, rows):
+    from app import db
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+
+
+def _users(count, rng, password_hash):
+    for i in range(count):
+        state = rng.choices(STATES, STATE_WEIGHTS)[0]
+        yield {
+            'username': f'donor{i}',
+            'email': f'donor{i}@example.com',
+            'password': password_hash,
+            'full_name': f'Donor {i}',
+            'phone': f'0{rng.randrange(500000000, 799999999)}',
+            'blood_type': rng.choices(BLOOD_TYPES, BLOOD_WEIGHTS)[0],
+            'city': state,
+            'district': rng.choice(REGIONS[state]),
+            'is_donor': rng.random() < 0.9,
+            'is_admin': False,
+            'created_at': EPOCH - timedelta(seconds=rng.randrange(3 * 365 * 86400)),
+        }
+
+
+def _requests(count, users, rng):
+    for _ in range(count):
+        state = rng.choices(STATES, STATE_WEIGHTS)[0]
+        age = timedelta(seconds=rng.randrange(365 * 86400))
+        # الطلبات القديمة غالباً تمت تلبيتها
+        fulfilled = rng.random() < (0.8 if age > timedelta(days=30) else 0.2)
+        yield {
+            'requester_id': rng.randrange(1, users + 1),
+            'blood_type': rng.choices(BLOOD_TYPES, BLOOD_WEIGHTS)[0],
+            'units_needed': rng.randint(1, 4),
+            'hospital': f'مستشفى {rng.choice(REGIONS[state])}',
+            'city': state,
+            'contact_phone': f'0{rng.randrange(500000000, 799999999)}',
+            'details': None,
+            'is_urgent': rng.random() < 0.2,
+            'is_fulfilled': fulfilled,
+            'created_at': EPOCH - age,
+        }
+
+
+def _reports(count, users, rng):
+    for _ in range(count):
+        yield {
+            'donor_id': rng.randrange(1, users + 1),
+            'report_type': rng.choice(REPORT_TYPES),
+            'report_details': 'بلاغ اصطناعي',
+            'reporter_name': None,
+            'reporter_contact': None,
+            'is_resolved': rng.random() < 0.7,
+            'created_at': EPOCH - timedelta(seconds=rng.randrange(365 * 86400)),
+        }
+
+
+def populate_users(count, seed, password_hash='x'):
+    """متبرعون فقط، للقياسات التي لا تحتاج طلبات ولا بلاغات."""
+    from app import db, User
+
+    _insert(User.__table__, _users(count, random.Random(seed), password_hash))
+    db.session.commit()
+
+
+def populate(users, seed, matches=True):
+    """يملأ قاعدة فارغة (بعد create_all) ويعيد عدد صفوف كل جدول."""
+    from app import db, hasher, insert_donor_matches, BloodRequest, DonorReport, User
+
+    rng = random.Random(seed)
+    # نفس التجزئة لكل المستخدمين: الكلفة الحقيقية لـ PBKDF2 في /login دون دفعها مليون مرة هنا
+    password_hash = hasher.hash(PASSWORD)
+    _insert(User.__table__, _users(users, rng, password_hash))
+    _insert(BloodRequest.__table__, _requests(users // 20, users, rng))
+    _insert(DonorReport.__table__, _reports(users // 100, users, rng))
+    db.session.add(User(
+        username=ADMIN_USERNAME, email='bench-admin@example.com', password=password_hash,
+        full_name='Benchmark Admin', phone='0000000000', blood_type='N/A', city='N/A',
+        district='N/A', is_admin=True, is_donor=False,
+    ))
+    counts = {'users': users + 1, 'requests': users // 20, 'reports': users // 100}
+    if matches:
+        counts['matches'] = insert_donor_matches()
+    db.session.commit()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='10k')
+    parser.add_argument('--database', required=True, help='SQLite file to create, or a database URL.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-matches', dest='matches', action='store_false',
+                        help='Leave request_donor_match empty.')
+    args = parser.parse_args()
+
+    benchmark_environment(args.database)
+    from app import app, db
+
+    started = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        counts = populate(SCALES[args.scale], args.seed, args.matches)
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+    summary = ', '.join(f'{count} {table}' for table, count in counts.items())
+    print(f'{summary} in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
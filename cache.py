@@ -0,0 +1,214 @@
+"""طبقة تخزين مؤقت قابلة للاستبدال: ذاكرة LRU محلية أو خادم متوافق مع Redis.
+
+الاختيار عبر CACHE_TYPE في إعدادات التطبيق:
+
+    local  ذاكرة LRU داخل العملية (الافتراضي)، مع حد لعدد المفاتيح ومدة صلاحية
+    redis  خادم Redis (أو متوافق معه) على CACHE_REDIS_URL، مشترك بين عمال gunicorn
+    null   بدون تخزين، كل قراءة تفشل وincr يعيد None
+
+العدادات (مثل أرقام الإصدارات) تُقرأ بـ incr(key, 0) لأنها ذرية في كل الخلفيات.
+تعطل خادم Redis لا يظهر كخطأ في الصفحة: القراءة تفشل، والكتابة والحذف يُتجاهلان، وincr يعيد None.
+"""
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class NullCache:
+    """خلفية لا تحفظ شيئاً، لتعطيل التخزين دون تغيير الكود المستدعي."""
+
+    def get(self, key, default=None):
+        return default
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+    def incr(self, key, delta=1, ttl=None):
+        # لا عداد محفوظ، فالقيمة غير معروفة كما في تعطل Redis ويتجاوز المستدعي التخزين
+        return None
+
+
+class LRUCache:
+    """ذاكرة داخل العملية تحذف الأقدم استخداماً عند تجاوز max_entries.
+
+    ttl بالثواني؛ القيمة 0 تعني بلا انتهاء.
+    """
+
+    def __init__(self, max_entries=1024, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expires_at(self, ttl):
+        ttl = self.default_ttl if ttl is None else ttl
+        return time.monotonic() + ttl if ttl else None
+
+    def _get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _set(self, key, value, expires_at):
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._get(key)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._set(key, value, self._expires_at(ttl))
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def incr(self, key, delta=1, ttl=None):
+        # ttl يُطبق فقط عند إنشاء العداد، وبدونه لا تنتهي صلاحيته
+        with self._lock:
+            value = self._get(key)
+            if value is _MISSING:
+                value, expires_at = delta, self._expires_at(ttl or 0)
+            else:
+                value, expires_at = value + delta, self._data[key][0]
+            self._set(key, value, expires_at)
+            return value
+
+
+class RedisCache:
+    """محول لخادم متوافق مع Redis.
+
+    client أي كائن بواجهة redis-py (get/set/delete/incrby/expire/scan_iter)، لذلك يمكن
+    تمرير بديل محلي مزيف في الاختبارات. القيم تُحفظ بـ pickle، والعدادات كأعداد Redis.
+    """
+
+    def __init__(self, client, key_prefix='', default_ttl=300):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.default_ttl = default_ttl
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis  # في requirements.txt، ويُستورد فقط عند CACHE_TYPE=redis
+
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def _key(self, key):
+        return f'{self.key_prefix}{key}'
+
+    def get(self, key, default=None):
+        # تعطل الخادم يعامل كقراءة فاشلة بدل خطأ في الصفحة
+        try:
+            raw = self.client.get(self._key(key))
+        except Exception:
+            logger.warning('cache get failed for %s', key, exc_info=True)
+            return default
+        return default if raw is None else pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            self.client.set(self._key(key), pickle.dumps(value), ex=ttl or None)
+        except Exception:
+            logger.warning('cache set failed for %s', key, exc_info=True)
+
+    def delete(self, *keys):
+        if not keys:
+            return
+        try:
+            self.client.delete(*[self._key(key) for key in keys])
+        except Exception:
+            logger.warning('cache delete failed for %s', keys, exc_info=True)
+
+    def clear(self):
+        try:
+            names = list(self.client.scan_iter(match=f'{self.key_prefix}*'))
+            if names:
+                self.client.delete(*names)
+        except Exception:
+            logger.warning('cache clear failed', exc_info=True)
+
+    def incr(self, key, delta=1, ttl=None):
+        # None عند تعطل الخادم، فلا يبنى مفتاح على رقم إصدار غير معروف
+        try:
+            value = int(self.client.incrby(self._key(key), delta))
+            if ttl and value == delta:
+                self.client.expire(self._key(key), ttl)
+        except Exception:
+            logger.warning('cache incr failed for %s', key, exc_info=True)
+            return None
+        return value
+
+
+def create_cache(config):
+    cache_type = config.get('CACHE_TYPE', 'local')
+    default_ttl = config.get('CACHE_DEFAULT_TTL', 300)
+    if cache_type == 'redis':
+        return RedisCache.from_url(
+            config['CACHE_REDIS_URL'],
+            key_prefix=config.get('CACHE_KEY_PREFIX', ''),
+            default_ttl=default_ttl,
+        )
+    if cache_type == 'null':
+        return NullCache()
+    if cache_type == 'local':
+        return LRUCache(config.get('CACHE_MAX_ENTRIES', 1024), default_ttl)
+    raise ValueError(f'Unknown CACHE_TYPE: {cache_type!r}')
+
+
+def make_key(key_prefix, args, kwargs):
+    parts = [str(arg) for arg in args]
+    parts += [f'{name}={kwargs[name]}' for name in sorted(kwargs)]
+    return ':'.join([key_prefix] + parts)
+
+
+def cached(cache, key_prefix, ttl=None):
+    """يحفظ نتيجة الدالة بمفتاح من key_prefix ومعاملاتها.
+
+    لدوال العرض في Flask تصل معاملات المسار كـ kwargs، فيكون المفتاح لكل قيمة مسار.
+    الدالة الناتجة تحمل invalidate(*args, **kwargs) لحذف مفتاح معين، وcache الخلفية المستعملة
+    (قابلة للاستبدال، كما يفعل querycount.cold_cache).
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            key = make_key(key_prefix, args, kwargs)
+            value = wrapper.cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = f(*args, **kwargs)
+                wrapper.cache.set(key, value, ttl)
+            return value
+
+        wrapper.cache = cache
+        wrapper.invalidate = lambda *args, **kwargs: wrapper.cache.delete(make_key(key_prefix, args, kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,170 @@
+"""طابور مهام خلفية بجدول SQLite محلي، فتبقى المهام المعلقة بعد إعادة تشغيل العمال.
+
+    jobs = JobQueue('instance/jobs.db')
+
+    @jobs.task
+    def send_report(report_id):
+        ...
+
+    jobs.enqueue('send_report', report_id=7)
+    jobs.start(workers=1)  # خيوط داخل العملية، أو flask jobs work في عملية مستقلة
+
+المهمة المحجوزة تحمل وقت الحجز؛ إذا توقف العامل قبل إنهائها تعود للانتظار بعد
+lease_seconds ما لم تستنفد max_attempts. المهمة الفاشلة يعاد تنفيذها حتى max_attempts مع تأخير متزايد.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS job (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 1,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after REAL NOT NULL,
+    locked_by TEXT,
+    locked_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_job_pending ON job (status, priority, run_after, id);
+"""
+
+
+class JobQueue:
+    def __init__(self, path, max_attempts=3, lease_seconds=300, poll_interval=1.0, retry_delay=30):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        # دالة تعيد مدير سياق تنفذ فيه كل مهمة، مثل app.app_context
+        self.context = None
+        self.tasks = {}
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    def _connect(self):
+        # اتصال لكل خيط؛ WAL حتى لا يحجب الإدراج من الطلبات قراءة العمال
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def task(self, fn):
+        self.tasks[fn.__name__] = fn
+        return fn
+
+    def enqueue(self, name, priority=1, **payload):
+        """priority الأصغر يُنفذ أولاً."""
+        if name not in self.tasks:
+            raise KeyError(f'Unknown task: {name}')
+        now = time.time()
+        cursor = self._connect().execute(
+            'INSERT INTO job (name, payload, priority, run_after, created_at) VALUES (?, ?, ?, ?, ?)',
+            (name, json.dumps(payload), priority, now, now),
+        )
+        self._wakeup.set()
+        return cursor.lastrowid
+
+    def claim(self, worker_id):
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # المهمة التي استنفدت محاولاتها وانتهى حجزها فشلت، حتى لا تعيد مهمة توقف العامل كل مرة إلى ما لا نهاية
+            expired = now - self.lease_seconds
+            failed = conn.execute(
+                "UPDATE job SET status = 'failed', locked_by = NULL, last_error = 'lease expired' "
+                "WHERE status = 'running' AND locked_at < ? AND attempts >= ?",
+                (expired, self.max_attempts),
+            ).rowcount
+            if failed:
+                logger.warning('%s job(s) failed after their lease expired on the last attempt', failed)
+            conn.execute(
+                "UPDATE job SET status = 'pending', locked_by = NULL WHERE status = 'running' AND locked_at < ?",
+                (expired,),
+            )
+            row = conn.execute(
+                "SELECT id, name, payload, attempts FROM job WHERE status = 'pending' AND run_after <= ? "
+                "ORDER BY priority, id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE job SET status = 'running', locked_by = ?, locked_at = ?, attempts = attempts + 1 "
+                    "WHERE id = ?",
+                    (worker_id, now, row[0]),
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def run_one(self, worker_id='inline'):
+        """ينفذ مهمة واحدة جاهزة إن وجدت، ويعيد True إذا نُفذت."""
+        row = self.claim(worker_id)
+        if row is None:
+            return False
+        job_id, name, payload, attempts = row
+        attempts += 1
+        conn = self._connect()
+        try:
+            with self.context() if self.context else nullcontext():
+                self.tasks[name](**json.loads(payload))
+        except Exception:
+            logger.exception('job %s (%s) failed on attempt %s', job_id, name, attempts)
+            status = 'failed' if attempts >= self.max_attempts else 'pending'
+            conn.execute(
+                'UPDATE job SET status = ?, locked_by = NULL, run_after = ?, last_error = ? WHERE id = ?',
+                (status, time.time() + self.retry_delay * attempts, traceback.format_exc(), job_id),
+            )
+        else:
+            conn.execute("UPDATE job SET status = 'done', locked_by = NULL WHERE id = ?", (job_id,))
+        return True
+
+    def work(self, worker_id, until_idle=False):
+        while not self._stop.is_set():
+            if not self.run_one(worker_id):
+                if until_idle:
+                    return
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def start(self, workers=1):
+        for i in range(workers):
+            thread = threading.Thread(
+                target=self.work, args=(f'{os.getpid()}-{i}',), name=f'job-worker-{i}', daemon=True,
+            )
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def stats(self):
+        rows = self._connect().execute('SELECT status, COUNT(*) FROM job GROUP BY status').fetchall()
+        return dict(rows)
+
+    def purge(self, older_than):
+        """يحذف المهام المنتهية الأقدم من older_than ثانية."""
+        cursor = self._connect().execute(
+            "DELETE FROM job WHERE status = 'done' AND created_at < ?", (time.time() - older_than,),
+        )
+        return cursor.rowcount
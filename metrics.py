@@ -0,0 +1,227 @@
+"""قياسات الطلبات بصيغة Prometheus: زمن كل endpoint، وعدد استعلامات SQL وزمنها، وزمن عرض القوالب.
+
+    metrics = RequestMetrics(directory='instance/metrics')
+    metrics.init_app(app, db.engine)   # بدون init_app لا يُسجَّل أي مستمع ولا كلفة إضافية
+    metrics.render()                   # نص صفحة /admin/metrics
+
+كل عامل يجمع قيمه في ذاكرته، وطلب /admin/metrics عبر منفذ gunicorn يصل لعامل واحد أياً كان؛
+لذلك يكتب كل عامل قيمه كل flush_interval ثانية في ملف خاص به داخل directory المشترك، ويجمع
+render العدادات والمدرجات من كل الملفات. قيم gauge (مثل طابور المهام) تُقرأ من مصدر مشترك فتؤخذ من
+العامل المجيب دون جمع. ملفات العمال المنتهين تبقى حتى لا تنقص العدادات، فيُفرغ المجلد عند إعادة
+تشغيل الخادم كله. بدون directory تكون القيم خاصة بالعامل المجيب.
+"""
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from time import perf_counter
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# مواضع القيم في قائمة g.request_stats
+_START, _QUERIES, _SQL, _RENDER = range(4)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # الأخير هو +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield bound, cumulative
+
+
+def _labels(labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class RequestMetrics:
+    def __init__(self, prefix='tabaro3', directory=None, flush_interval=5):
+        self.prefix = prefix
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))  # (endpoint, method)
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))  # endpoint
+        self.sql_seconds = defaultdict(float)  # endpoint
+        self.render_seconds = defaultdict(float)  # endpoint
+        self.responses = Counter()  # (endpoint, method, status)
+        # دوال إضافية تعيد [(الاسم، النوع، الوصف، [(labels، القيمة)])]، مثل عدادات تسجيل الدخول
+        self.collectors = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flushed = perf_counter()
+        self._pid = self._path = None
+
+    def init_app(self, app, engine):
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.flush)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        # بدون blinker لا تُرسل إشارات Flask الخاصة بالقوالب، فيُقاس render على مستوى Jinja.
+        # القوالب المضمّنة (extends/include) لا تستدعي render فتُحسب ضمن القالب الأعلى
+        add = self._add
+
+        class TimedTemplate(app.jinja_env.template_class):
+            def render(self, *args, **kwargs):
+                started = perf_counter()
+                try:
+                    return super().render(*args, **kwargs)
+                finally:
+                    add(_RENDER, perf_counter() - started)
+
+        app.jinja_env.template_class = TimedTemplate
+
+    def _start_request(self):
+        g.request_stats = [perf_counter(), 0, 0.0, 0.0]
+
+    def _add(self, index, value):
+        stats = g.get('request_stats') if has_app_context() else None
+        if stats is not None:
+            stats[index] += value
+
+    # البداية تُحفظ في سياق التنفيذ لا في conn.info، لأن after_cursor_execute لا يُستدعى عند فشل
+    # الاستعلام فتبقى القيمة في الاتصال المحفوظ بالمجمع إلى الأبد
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.metrics_query_start = perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'metrics_query_start', None)
+        if started is None:
+            return
+        elapsed = perf_counter() - started
+        stats = g.get('request_stats') if has_app_context() else None
+        if stats is not None:
+            stats[_QUERIES] += 1
+            stats[_SQL] += elapsed
+
+    def _finish_request(self, response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        elapsed = perf_counter() - stats[_START]
+        # اسم endpoint بدل المسار حتى لا يتضخم عدد السلاسل (/request/1، /request/2 ...)
+        endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+        with self._lock:
+            self.latency[endpoint, request.method].observe(elapsed)
+            self.queries[endpoint].observe(stats[_QUERIES])
+            self.sql_seconds[endpoint] += stats[_SQL]
+            self.render_seconds[endpoint] += stats[_RENDER]
+            self.responses[endpoint, request.method, response.status_code] += 1
+        if self.directory and perf_counter() - self._flushed >= self.flush_interval:
+            self.flush()
+        return response
+
+    def _families(self):
+        with self._lock:
+            yield ('request_duration_seconds', 'histogram', 'Request latency by endpoint.',
+                   [(dict(endpoint=endpoint, method=method), histogram)
+                    for (endpoint, method), histogram in sorted(self.latency.items())])
+            yield ('request_sql_queries', 'histogram', 'SQL statements per request.',
+                   [(dict(endpoint=endpoint), histogram) for endpoint, histogram in sorted(self.queries.items())])
+            yield ('request_sql_seconds_total', 'counter', 'Time spent in SQL statements.',
+                   [(dict(endpoint=endpoint), value) for endpoint, value in sorted(self.sql_seconds.items())])
+            yield ('request_render_seconds_total', 'counter', 'Time spent rendering templates.',
+                   [(dict(endpoint=endpoint), value) for endpoint, value in sorted(self.render_seconds.items())])
+            yield ('responses_total', 'counter', 'Responses by endpoint and status.',
+                   [(dict(endpoint=endpoint, method=method, status=status), value)
+                    for (endpoint, method, status), value in sorted(self.responses.items())])
+        for collector in self.collectors:
+            yield from collector()
+
+    def _flatten(self):
+        """[(الاسم، النوع، الوصف، [(اسم العينة، labels، القيمة)])] بعد فك كل مدرج إلى _bucket و_sum و_count."""
+        families = []
+        for name, kind, description, samples in self._families():
+            name = f'{self.prefix}_{name}'
+            rows = []
+            for labels, value in samples:
+                labels = {key: str(label) for key, label in labels.items()}
+                if isinstance(value, Histogram):
+                    for bound, count in value.samples():
+                        rows.append((f'{name}_bucket', dict(labels, le=str(bound)), count))
+                    rows.append((f'{name}_sum', labels, value.sum))
+                    rows.append((f'{name}_count', labels, sum(value.counts)))
+                else:
+                    rows.append((name, labels, value))
+            families.append((name, kind, description, rows))
+        return families
+
+    def flush(self):
+        """يكتب عدادات هذا العامل ومدرجاته في ملفه داخل directory، ليجمعها render في أي عامل."""
+        if not self.directory:
+            return
+        with self._flush_lock:
+            # اسم جديد بعد fork (gunicorn --preload) وعند إعادة استعمال pid، فلا يكتب عاملان نفس الملف
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._path = os.path.join(self.directory, f'{self._pid}-{time.time_ns()}.json')
+            families = [family for family in self._flatten() if family[1] != 'gauge']
+            with open(self._path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(families, f)
+            os.replace(self._path + '.tmp', self._path)
+            self._flushed = perf_counter()
+
+    def _merged(self):
+        own = self._flatten()
+        if not self.directory:
+            return own
+        self.flush()
+        totals = {}
+        # ملف هذا العامل أولاً حتى يبقى ترتيب العينات (والـ buckets) كما في own
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.json')), key=lambda path: path != self._path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    families = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, kind, description, rows in families:
+                family = totals.setdefault(name, (kind, description, {}))
+                for sample, labels, value in rows:
+                    key = sample, tuple(labels.items())
+                    family[2][key] = family[2].get(key, 0) + value
+        # gauge من العامل المجيب، والباقي مجموع كل العمال بترتيب own ثم العائلات التي لا يعرفها هذا العامل
+        merged = []
+        for name, kind, description, rows in own:
+            if kind == 'gauge':
+                merged.append((name, kind, description, rows))
+            elif name in totals:
+                merged.append((name,) + totals.pop(name))
+        merged += [(name,) + family for name, family in totals.items()]
+        return [
+            (name, kind, description, rows if kind == 'gauge' else [
+                (sample, dict(labels), value) for (sample, labels), value in rows.items()
+            ])
+            for name, kind, description, rows in merged
+        ]
+
+    def render(self):
+        lines = []
+        for name, kind, description, rows in self._merged():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for sample, labels, value in rows:
+                lines.append(f'{sample}{_labels(labels)} {value}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,28 @@
+"""Add donor search indexes
+
+Revision ID: 7c1e5b2d9a10
+Revises: 409e2a64abc4
+Create Date: 2026-10-18 09:12:41.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1e5b2d9a10'
+down_revision = '409e2a64abc4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_donor_search', ['is_donor', 'blood_type', 'city', 'district'], unique=False)
+        batch_op.create_index('ix_user_donor_location', ['is_donor', 'city', 'district'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_donor_location')
+        batch_op.drop_index('ix_user_donor_search')
@@ -0,0 +1,26 @@
+"""Add open requests index
+
+Revision ID: b3f0d6a4e821
+Revises: 7c1e5b2d9a10
+Create Date: 2026-10-18 10:02:17.540916
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f0d6a4e821'
+down_revision = '7c1e5b2d9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('blood_request', schema=None) as batch_op:
+        batch_op.create_index('ix_blood_request_open_created', ['is_fulfilled', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('blood_request', schema=None) as batch_op:
+        batch_op.drop_index('ix_blood_request_open_created')
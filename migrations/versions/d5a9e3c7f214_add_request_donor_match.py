@@ -0,0 +1,37 @@
+"""Add request donor match table
+
+Revision ID: d5a9e3c7f214
+Revises: b3f0d6a4e821
+Create Date: 2026-10-18 11:40:52.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a9e3c7f214'
+down_revision = 'b3f0d6a4e821'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('request_donor_match',
+    sa.Column('request_id', sa.Integer(), nullable=False),
+    sa.Column('donor_id', sa.Integer(), nullable=False),
+    sa.Column('is_exact', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['donor_id'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['request_id'], ['blood_request.id'], ),
+    sa.PrimaryKeyConstraint('request_id', 'donor_id')
+    )
+    with op.batch_alter_table('request_donor_match', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_request_donor_match_donor_id'), ['donor_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('request_donor_match', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_request_donor_match_donor_id'))
+
+    op.drop_table('request_donor_match')
@@ -0,0 +1,71 @@
+"""تجزئة كلمات المرور (PBKDF2) في مجمع عمال محدود بدل خيط الطلب.
+
+hashlib يحرر الـ GIL أثناء PBKDF2، فيعمل المجمع بالتوازي مع باقي الطلبات، بينما يحد
+max_workers من عدد التجزئات المتزامنة ويحد max_pending من طابور الانتظار. عند امتلاء
+الطابور أو تجاوز timeout يُرفع HasherBusy بدل تكديس الطلبات.
+"""
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """عدد عمليات التجزئة الجارية والمنتظرة تجاوز الحد."""
+
+
+class PasswordHasher:
+    """method بصيغة werkzeug الكاملة مثل pbkdf2:sha256:260000 (عدد التكرارات هو معامل العمل).
+
+    max_workers=0 ينفذ التجزئة مباشرة على خيط الطلب.
+    """
+
+    def __init__(self, method='pbkdf2:sha256:260000', max_workers=2, max_pending=32, timeout=30):
+        self.method = method
+        # werkzeug يكتب المعاملات كاملة في التجزئة (pbkdf2:sha256 -> pbkdf2:sha256:260000)،
+        # فتُقارن التجزئات ببادئة تجزئة فعلية لا بنص method كما هو
+        self.prefix = generate_password_hash('', method).split('$', 1)[0]
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='hasher') if max_workers else None
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending) if max_workers else None
+
+    def _run(self, fn, *args):
+        if self._executor is None:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # المكان يُحرر عند انتهاء التجزئة نفسها لا عند انتهاء الانتظار، حتى لا يتجاوز المجمع حده
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            raise HasherBusy() from None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """للاستيراد الدفعي: كل التجزئات بالتوازي على المجمع، دون حد الطابور."""
+        if self._executor is None:
+            return [self.hash(password) for password in passwords]
+        return list(self._executor.map(generate_password_hash, passwords, itertools.repeat(self.method)))
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        return pwhash.split('$', 1)[0] != self.prefix
+
+    def verify_and_update(self, pwhash, password):
+        """يعيد (صحيحة؟, تجزئة جديدة أو None) لإعادة التجزئة عند تغيّر المعاملات."""
+        if not self.verify(pwhash, password):
+            return False, None
+        if self.needs_rehash(pwhash):
+            return True, self.hash(password)
+        return True, None
@@ -0,0 +1,197 @@
+"""تشخيص عامل مشغول دون إيقافه: عينات دورية لمكدسات كل الخيوط، وcProfile لطلب واحد.
+
+    profiler = Profiler('instance/profiles')
+    profiler.init_app(app, authorize)       # ترويسة X-Profile: 1 تحفظ cProfile للطلب في ملف .prof
+    profiler.sample(10, interval=0.005)     # خيط خلفي يكتب sample-<pid>-....speedscope.json
+
+العينات تؤخذ من sys._current_frames() في خيط منفصل، فتعمل مع أي خيط يخدم الطلبات (الإشارات
+مثل SIGPROF لا تصل إلا للخيط الرئيسي وتقطع استدعاءات النظام في gunicorn). الناتج بصيغة
+speedscope (https://www.speedscope.app) أو المكدسات المطوية (collapsed) لـ flamegraph.pl.
+الملفات خاصة بكل عملية (pid في الاسم) لكنها في مجلد مشترك، فتُقرأ من أي عامل.
+"""
+import cProfile
+import io
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from time import perf_counter
+
+from flask import g, request
+
+FORMATS = {'speedscope': '.speedscope.json', 'collapsed': '.collapsed.txt'}
+PROFILE_HEADER = 'X-Profile'
+
+
+class ProfilerBusy(Exception):
+    """عينة أخرى قيد التشغيل في هذه العملية."""
+
+
+def _frame_key(code):
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+def collapsed(counts):
+    """سطر لكل مكدس: thread;outer;...;inner count"""
+    lines = []
+    for (thread, stack), count in counts.most_common():
+        names = [thread] + [f'{name} ({os.path.basename(filename)}:{line})' for name, filename, line in stack]
+        lines.append(f'{";".join(names)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def speedscope(counts, weight, name):
+    """ملف speedscope بملف sampled لكل خيط، ووزن كل عينة weight ثانية."""
+    frames, index = [], {}
+    profiles = {}
+    for (thread, stack), count in sorted(counts.items()):
+        samples = []
+        for key in stack:
+            if key not in index:
+                index[key] = len(frames)
+                frames.append({'name': key[0], 'file': key[1], 'line': key[2]})
+            samples.append(index[key])
+        profile = profiles.setdefault(thread, {
+            'type': 'sampled', 'name': thread, 'unit': 'seconds',
+            'startValue': 0, 'endValue': 0, 'samples': [], 'weights': [],
+        })
+        profile['samples'].append(samples)
+        profile['weights'].append(count * weight)
+        profile['endValue'] += count * weight
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'tabaro3 profiling.py',
+        'shared': {'frames': frames},
+        'profiles': list(profiles.values()),
+    }
+
+
+class Profiler:
+    def __init__(self, directory, max_seconds=60, max_files=50):
+        self.directory = directory
+        self.max_seconds = max_seconds
+        self.max_files = max_files
+        self._sampling = threading.Lock()
+
+    def _path(self, kind, suffix):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        return os.path.join(self.directory, f'{kind}-{os.getpid()}-{stamp}{suffix}')
+
+    def _prune(self):
+        # أقدم الملفات تُحذف أولاً حتى لا يمتلئ القرص بتشخيصات منسية
+        files = sorted(self.files(), key=lambda f: f['modified'])
+        for old in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, old['name']))
+            except OSError:
+                pass
+
+    def files(self):
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append({'name': entry.name, 'bytes': stat.st_size, 'modified': stat.st_mtime})
+        return sorted(entries, key=lambda f: f['modified'], reverse=True)
+
+    def sample(self, seconds, interval=0.01, fmt='speedscope'):
+        """يبدأ خيط العينات ويعيد (الخيط، اسم الملف الذي سيكتبه عند الانتهاء)."""
+        if fmt not in FORMATS:
+            raise ValueError(f'unknown format {fmt!r}')
+        # nan يمر من min/max دون تغيير ويوقف خيط العينات بخطأ بعد أن يُعاد اسم الملف للمستدعي
+        if not (math.isfinite(seconds) and math.isfinite(interval)):
+            raise ValueError('seconds and interval must be finite')
+        seconds = min(max(seconds, 0.1), self.max_seconds)
+        # فترة أطول من المدة تحجز القفل بعد انتهائها فيرد العامل 409 على كل طلب لاحق
+        interval = min(max(interval, 0.001), seconds)
+        if not self._sampling.acquire(blocking=False):
+            raise ProfilerBusy()
+        path = self._path('sample', FORMATS[fmt])
+        thread = threading.Thread(
+            target=self._run, args=(seconds, interval, fmt, path), name='profiler-sampler', daemon=True,
+        )
+        thread.start()
+        return thread, os.path.basename(path)
+
+    def _run(self, seconds, interval, fmt, path):
+        try:
+            counts, weight = self._collect(seconds, interval)
+            if fmt == 'speedscope':
+                content = json.dumps(speedscope(counts, weight, os.path.basename(path)))
+            else:
+                content = collapsed(counts)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            self._prune()
+        finally:
+            self._sampling.release()
+
+    def _collect(self, seconds, interval):
+        own = threading.get_ident()
+        counts = Counter()
+        ticks = 0
+        started = perf_counter()
+        deadline = started + seconds
+        while perf_counter() < deadline:
+            ticks += 1
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_key(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                counts[names.get(ident, str(ident)), tuple(stack)] += 1
+            time.sleep(interval)
+        # الزمن الفعلي لكل عينة أطول من interval بكلفة المرور على المكدسات
+        return counts, (perf_counter() - started) / max(ticks, 1)
+
+    def init_app(self, app, authorize):
+        """authorize() يقرر هل يحق لصاحب الطلب تشغيل cProfile (مدير أو رمز)."""
+        self.authorize = authorize
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+    def _start_request(self):
+        if request.headers.get(PROFILE_HEADER) != '1' or not self.authorize():
+            return
+        g.request_profile = cProfile.Profile()
+        g.request_profile.enable()
+
+    def _finish_request(self, response):
+        profile = g.pop('request_profile', None)
+        if profile is None:
+            return response
+        profile.disable()
+        endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+        path = self._path(f'request-{endpoint}', '.prof')
+        profile.dump_stats(path)
+        self._prune()
+        response.headers['X-Profile-File'] = os.path.basename(path)
+        return response
+
+    def _teardown_request(self, exc):
+        # الطلب انتهى باستثناء قبل after_request
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            profile.disable()
+
+
+def stats_text(path, limit=40, sort='cumulative'):
+    """ملخص pstats لملف .prof، أعلى limit دالة حسب sort."""
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
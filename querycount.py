@@ -0,0 +1,105 @@
+"""عدّ استعلامات SQL المنفذة أثناء طلب واحد لاكتشاف مشكلة N+1 في صفحات القوائم.
+
+    with cold_request(tabaro3), assert_max_queries(tabaro3.db.engine, 2, '/admin/panels/requests'):
+        client.get('/admin/panels/requests')
+
+الحد المعتمد لكل صفحة في query_budget.json، ويتحقق منه tests/test_query_budget.py على قاعدة
+اصطناعية، وflask check-queries على القاعدة المهيأة.
+"""
+import json
+from contextlib import contextmanager
+from inspect import isfunction
+from time import perf_counter
+
+from sqlalchemy import event
+
+from cache import LRUCache
+
+
+class QueryCounter:
+    """مستمعا before/after_cursor_execute: نص كل استعلام منفذ ومجموع زمن تنفيذها بالثواني."""
+
+    def __init__(self):
+        self.statements = []
+        self.seconds = 0.0
+
+    def before(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        if context is not None:
+            context.query_counter_start = perf_counter()
+
+    def after(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'query_counter_start', None)
+        if started is not None:
+            self.seconds += perf_counter() - started
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine):
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter.before)
+    event.listen(engine, 'after_cursor_execute', counter.after)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter.before)
+        event.remove(engine, 'after_cursor_execute', counter.after)
+
+
+@contextmanager
+def assert_max_queries(engine, limit, label='block'):
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        statements = '\n'.join(counter.statements)
+        raise AssertionError(f'{label} issued {counter.count} queries (limit {limit}):\n{statements}')
+
+
+def load_budget(path):
+    """{url: أقصى عدد استعلامات} بترتيب الملف."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@contextmanager
+def cold_cache(app_module):
+    """يستبدل app_module.cache ودوال @cached المبنية عليها بـ LRUCache فارغة حتى نهاية الكتلة.
+
+    ذاكرة التطبيق لا تُمس، فلا تُحذف من خادم Redis أرقام إصدارات البحث ونوافذ محاولات الدخول.
+    """
+    shared = app_module.cache
+    functions = [f for f in vars(app_module).values() if isfunction(f) and getattr(f, 'cache', None) is shared]
+    cold = LRUCache()
+    app_module.cache = cold
+    for f in functions:
+        f.cache = cold
+    try:
+        yield cold
+    finally:
+        app_module.cache = shared
+        for f in functions:
+            f.cache = shared
+
+
+@contextmanager
+def cold_request(app_module):
+    """المسار البارد لطلب العميل داخل الكتلة.
+
+    جلسة فارغة وg بلا مستخدم محفوظ، لأن طلبات العميل قد تشارك سياق التطبيق المفتوح،
+    وذاكرة مؤقتة فارغة حتى تُعد استعلامات الصفحة كلها.
+    """
+    app_module.db.session.remove()
+    app_module.forget_current_user()
+    with cold_cache(app_module):
+        yield
+
+
+def count_page_queries(app_module, client, url):
+    """QueryCounter لطلب GET واحد على المسار البارد."""
+    with cold_request(app_module), count_queries(app_module.db.engine) as counter:
+        client.get(url)
+    return counter
@@ -0,0 +1,47 @@
+"""الولايات الجزائرية ودوائرها كما في static/js/algeria_cities.js، تُقرأ مرة واحدة عند الاستيراد.
+
+    find_state('16')                      # '16 - الجزائر'
+    is_daira('16 - الجزائر', 'باب الوادي')  # True
+
+ويُقدّم نفس المحتوى للمتصفح كملف JSON ثابت: REGIONS_VERSION بصمة المحتوى وجزء من الرابط،
+وREGIONS_VARIANTS نسخه المضغوطة مسبقاً حسب Content-Encoding.
+"""
+import hashlib
+import json
+import os
+from types import MappingProxyType
+
+from assets import compress
+
+SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'js', 'algeria_cities.js')
+
+
+def load_regions(path=SOURCE):
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    # الملف كائن JSON مسند لمتغير JavaScript، متبوع بشيفرة تعبئة القوائم
+    data = json.loads(source[source.index('{'):source.index('};') + 1])
+    return MappingProxyType({state: tuple(dairas) for state, dairas in data.items()})
+
+
+# الولاية بالتنسيق "01 - أدرار" -> دوائرها بترتيب الملف، للقراءة فقط
+REGIONS = load_regions()
+_DAIRAS = {state: frozenset(dairas) for state, dairas in REGIONS.items()}
+_BY_CODE = {state.split(' - ', 1)[0]: state for state in REGIONS}
+REGIONS_JSON = json.dumps(dict(REGIONS), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+REGIONS_VERSION = hashlib.sha256(REGIONS_JSON).hexdigest()[:12]
+REGIONS_VARIANTS = MappingProxyType({'identity': REGIONS_JSON, **compress(REGIONS_JSON)})
+
+
+def find_state(value):
+    """الولاية بالتنسيق المخزن في قاعدة البيانات، من الاسم الكامل أو الرمز ("16" أو "6")."""
+    value = value.strip()
+    if value in _DAIRAS:
+        return value
+    if value.isdigit():
+        return _BY_CODE.get(value.zfill(2))
+    return None
+
+
+def is_daira(state, daira):
+    return daira in _DAIRAS.get(state, ())
@@ -0,0 +1,126 @@
+"""سجل الاستعلامات البطيئة: كل استعلام يتجاوز threshold_ms يُكتب سطر JSON في ملف دوّار، مع
+معاملاته وendpoint الطلب وخطة التنفيذ (EXPLAIN QUERY PLAN في SQLite وEXPLAIN في PostgreSQL).
+
+    slow_queries = SlowQueryLog('instance/slow_queries.log', threshold_ms=200)
+    slow_queries.init_app(db.engine)
+
+الخطة تُطلب لاستعلامات SELECT فقط، على مؤشر DBAPI منفصل حتى لا تمر بمستمعي SQLAlchemy.
+"""
+import json
+import logging
+import logging.handlers
+import os
+from datetime import datetime
+from time import perf_counter
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+# تجزئات كلمات المرور لا تُكتب في السجل
+REDACTED_PREFIXES = ('pbkdf2:', 'scrypt:')
+MAX_PARAMETER_LENGTH = 200
+
+
+def _parameter(value):
+    if isinstance(value, str):
+        if value.startswith(REDACTED_PREFIXES):
+            return '<redacted>'
+        if len(value) > MAX_PARAMETER_LENGTH:
+            return value[:MAX_PARAMETER_LENGTH] + '...'
+        return value
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _parameters(parameters):
+    if isinstance(parameters, dict):
+        return {key: _parameter(value) for key, value in parameters.items()}
+    return [_parameter(value) for value in parameters or ()]
+
+
+class SlowQueryLog:
+    def __init__(self, path, threshold_ms=200, max_bytes=10 * 1024 * 1024, backups=5):
+        self.threshold = threshold_ms / 1000
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger = logging.getLogger(f'{__name__}.{os.path.abspath(path)}')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(handler)
+
+    def init_app(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    # في سياق التنفيذ كما في metrics.py، فلا يترك الاستعلام الفاشل قيمة في الاتصال
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.slow_query_start = perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'slow_query_start', None)
+        if started is None:
+            return
+        elapsed = perf_counter() - started
+        if elapsed < self.threshold:
+            return
+        record = {
+            'time': datetime.utcnow().isoformat(),
+            'duration_ms': round(elapsed * 1000, 3),
+            'statement': statement,
+            'parameters': None if executemany else _parameters(parameters),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'path': request.full_path if has_request_context() else None,
+            'plan': None if executemany else self.explain(conn, statement, parameters),
+        }
+        self.logger.info(json.dumps(record, ensure_ascii=False))
+
+    def explain(self, conn, statement, parameters):
+        if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return None
+        dialect = conn.dialect.name
+        if dialect == 'sqlite':
+            prefix = 'EXPLAIN QUERY PLAN '
+        elif dialect == 'postgresql':
+            prefix = 'EXPLAIN '
+        else:
+            return None
+        # في PostgreSQL يعمل EXPLAIN داخل معاملة الطلب المفتوحة، وفشله يجهضها فتفشل كل
+        # استعلامات الطلب التالية؛ لذلك يُحاط بنقطة حفظ يُرجع إليها عند الخطأ
+        savepoint = dialect == 'postgresql' and not getattr(conn.connection.dbapi_connection, 'autocommit', False)
+        cursor = conn.connection.cursor()
+        try:
+            if savepoint:
+                cursor.execute('SAVEPOINT slowlog_explain')
+            try:
+                cursor.execute(prefix + statement, parameters)
+                rows = cursor.fetchall()
+            except Exception as e:
+                if savepoint:
+                    cursor.execute('ROLLBACK TO SAVEPOINT slowlog_explain')
+                return [f'EXPLAIN failed: {e}']
+            if savepoint:
+                cursor.execute('RELEASE SAVEPOINT slowlog_explain')
+        finally:
+            cursor.close()
+        if dialect == 'sqlite':
+            # (id, parent, notused, detail)
+            return [row[-1] for row in rows]
+        return [row[0] for row in rows]
+
+
+def summarize(lines):
+    """يجمع أسطر السجل حسب (endpoint، الاستعلام): العدد والزمن الكلي والأقصى وخطة أبطأ تنفيذ."""
+    groups = {}
+    for line in lines:
+        record = json.loads(line)
+        key = (record['endpoint'], record['statement'])
+        group = groups.setdefault(key, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'plan': None})
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        if record['duration_ms'] >= group['max_ms']:
+            group['max_ms'] = record['duration_ms']
+            group['plan'] = record['plan']
+    return sorted(groups.items(), key=lambda item: item[1]['total_ms'], reverse=True)
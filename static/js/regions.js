@@ -0,0 +1,11 @@
+// بيانات الولايات والدوائر تُجلب مرة واحدة لكل صفحة من /regions.<بصمة>.json (انظر regions.py).
+// الاستعمال: withRegions(function(algeriaStatesAndCities) { ... })
+const regionsUrl = document.currentScript.dataset.url;
+let regionsPromise = null;
+
+function withRegions(callback) {
+    if (!regionsPromise) {
+        regionsPromise = fetch(regionsUrl).then(response => response.json());
+    }
+    return regionsPromise.then(callback);
+}
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""إعداد الاختبارات: قاعدة مؤقتة قبل استيراد app.py، لأن الرابط والمحرك يُقرآن عند الاستيراد.
+
+TEST_DATABASE_URL يشغّل كل الاختبارات على قاعدة أخرى (PostgreSQL مثلاً)، ومعه فقط تعمل
+الاختبارات المعلّمة بـ requires_postgres. الجداول تُحذف وتُنشأ في كل قاعدة مؤقتة، فلا تشِر إلى قاعدة حقيقية.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+from flask.testing import FlaskClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'benchmarks')]
+
+_tmp = tempfile.mkdtemp(prefix='tabaro3-tests-')
+os.environ['DATABASE_URL'] = os.environ.get('TEST_DATABASE_URL') or f'sqlite:///{_tmp}/test.db'
+os.environ['JOB_QUEUE_PATH'] = os.path.join(_tmp, 'jobs.db')
+os.environ['JOB_WORKERS'] = '0'
+os.environ['CACHE_TYPE'] = 'local'
+os.environ.pop('METRICS_ENABLED', None)
+os.environ['METRICS_DIR'] = os.path.join(_tmp, 'metrics')
+os.environ.pop('SLOW_QUERY_LOG', None)
+os.environ.pop('PROFILING_ENABLED', None)
+
+import app as tabaro3  # noqa: E402
+
+requires_postgres = pytest.mark.skipif(
+    not tabaro3.app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'),
+    reason='set TEST_DATABASE_URL to a PostgreSQL database',
+)
+
+
+class FakeRedis:
+    """بديل محلي لواجهة redis-py التي يستعملها RedisCache."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def _alive(self, name):
+        if name in self.expiry and self.expiry[name] <= time.monotonic():
+            self.data.pop(name, None)
+            self.expiry.pop(name, None)
+        return name in self.data
+
+    def get(self, name):
+        return self.data[name] if self._alive(name) else None
+
+    def set(self, name, value, ex=None):
+        self.data[name] = value
+        self.expiry.pop(name, None)
+        if ex:
+            self.expiry[name] = time.monotonic() + ex
+
+    def delete(self, *names):
+        for name in names:
+            self.data.pop(name, None)
+            self.expiry.pop(name, None)
+
+    def incrby(self, name, amount):
+        value = int(self.data[name]) + amount if self._alive(name) else amount
+        self.data[name] = str(value).encode()
+        return value
+
+    def expire(self, name, seconds):
+        self.expiry[name] = time.monotonic() + seconds
+
+    def scan_iter(self, match):
+        prefix = match.rstrip('*')
+        return [name for name in list(self.data) if name.startswith(prefix) and self._alive(name)]
+
+
+class DownRedis:
+    """خادم متعطل: كل أمر يرفع ConnectionError."""
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError('redis is down')
+        return fail
+
+class IsolatedClient(FlaskClient):
+    """كل طلب في سياق تطبيق جديد كما في الخادم، فلا يرث g وجلسة قاعدة البيانات من الاختبار."""
+
+    def open(self, *args, **kwargs):
+        with self.application.app_context():
+            return super().open(*args, **kwargs)
+
+
+@pytest.fixture(scope='session')
+def app():
+    tabaro3.app.config['TESTING'] = True
+    tabaro3.app.test_client_class = IsolatedClient
+    with tabaro3.app.app_context():
+        yield tabaro3.app
+
+
+def _reset():
+    tabaro3.db.session.remove()
+    tabaro3.db.drop_all()
+    tabaro3.db.create_all()
+    tabaro3.cache.clear()
+
+
+@pytest.fixture
+def empty_db(app):
+    _reset()
+    yield tabaro3.db
+    tabaro3.db.session.remove()
+
+
+@pytest.fixture(scope='module')
+def synthetic_db(app):
+    """قاعدة benchmarks/synthetic.py صغيرة (2000 مستخدم) مع جدول المطابقة، لكل وحدة اختبار."""
+    import synthetic
+
+    _reset()
+    synthetic.populate(2000, seed=42)
+    yield tabaro3.db
+    tabaro3.db.session.remove()
+
+
+@pytest.fixture
+def page_queries():
+    """page_queries(client, url) يعيد QueryCounter لطلب GET بارد، كما يقيسه flask check-queries."""
+    from querycount import count_page_queries
+
+    return lambda client, url: count_page_queries(tabaro3, client, url)
+
+
+@pytest.fixture
+def client_as(app):
+    """عميل اختبار بجلسة المستخدم user_id (أو بدون جلسة مع None)."""
+    def make(user_id=None):
+        client = app.test_client()
+        if user_id is not None:
+            with client.session_transaction() as flask_session:
+                flask_session['user_id'] = user_id
+        return client
+    return make
+
+
+def make_user(username, **fields):
+    values = dict(
+        email=f'{username}@example.com', password='!', full_name=username, phone='0500000000',
+        blood_type='O+', city='16 - الجزائر', district='باب الوادي', is_donor=True, is_admin=False,
+    )
+    values.update(fields)
+    user = tabaro3.User(username=username, **values)
+    tabaro3.db.session.add(user)
+    tabaro3.db.session.commit()
+    return user
@@ -0,0 +1,110 @@
+import gzip
+import os
+
+import pytest
+from flask import url_for
+
+import app as tabaro3
+from assets import build, compress, load_manifest, minify_css
+
+
+@pytest.fixture
+def static(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'images').mkdir()
+    (tmp_path / 'css' / 'site.css').write_text('body {\n  color: red;\n}\n.logo { background: url("../images/logo.svg"); }\n')
+    (tmp_path / 'images' / 'logo.svg').write_text('<svg>\n  <!-- logo -->\n  <rect/>\n</svg>\n')
+    return tmp_path
+
+
+def dist_files(static):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), static).replace(os.sep, '/')
+        for root, dirs, files in os.walk(static / 'dist') for name in files
+    )
+
+
+def test_minify_css_keeps_strings():
+    assert minify_css('a {\n  content: "x  ;  y";  /* c */\n}') == 'a{content:"x  ;  y"}'
+
+
+def test_build_rewrites_css_urls_to_fingerprinted_names(static):
+    build(str(static))
+    assets, encodings = load_manifest(str(static))
+    css = (static / assets['css/site.css']).read_text()
+    logo = os.path.basename(assets['images/logo.svg'])
+    assert css == f'body{{color:red}}.logo{{background:url("../images/{logo}")}}'
+    # br فقط مع حزمة brotli
+    assert sorted(encodings[assets['css/site.css']]) == sorted(compress(b''))
+    assert gzip.decompress((static / (assets['css/site.css'] + '.gz')).read_bytes()).decode() == css
+
+
+def test_rebuild_keeps_previous_build_for_running_workers(static):
+    build(str(static))
+    first = load_manifest(str(static))[0]['css/site.css']
+    (static / 'css' / 'site.css').write_text('body { color: blue; }')
+    build(str(static))
+    second = load_manifest(str(static))[0]['css/site.css']
+    assert second != first
+    assert {first, first + '.gz', second, second + '.gz'} <= set(dist_files(static))
+
+    (static / 'css' / 'site.css').write_text('body { color: green; }')
+    build(str(static))
+    files = dist_files(static)
+    assert first not in files and first + '.gz' not in files and second in files
+    assert not [name for name in files if name.endswith('.tmp')]
+
+
+@pytest.fixture
+def built_static(static, app, monkeypatch):
+    build(str(static))
+    files, encodings = load_manifest(str(static))
+    monkeypatch.setattr(app, 'static_folder', str(static))
+    monkeypatch.setattr(tabaro3, 'ASSET_FILES', files)
+    monkeypatch.setattr(tabaro3, 'ASSET_ENCODINGS', encodings)
+    return files
+
+
+def test_static_urls_point_to_fingerprinted_files(built_static, app):
+    with app.test_request_context():
+        assert url_for('static', filename='css/site.css') == f"/static/{built_static['css/site.css']}"
+        assert url_for('static', filename='css/other.css') == '/static/css/other.css'
+
+
+def test_serve_static_prefers_precompressed_variant(empty_db, built_static, client_as):
+    client = client_as()
+    url = f"/static/{built_static['css/site.css']}"
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.mimetype == 'text/css'
+    plain = client.get(url)
+    assert 'Content-Encoding' not in plain.headers
+    assert gzip.decompress(compressed.data) == plain.data
+    for response in (compressed, plain):
+        assert response.cache_control.max_age == 365 * 24 * 3600 and response.cache_control.immutable
+        assert 'Accept-Encoding' in response.vary
+    if 'br' in compress(b''):
+        import brotli
+
+        preferred = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+        assert preferred.headers['Content-Encoding'] == 'br'
+        assert brotli.decompress(preferred.data) == plain.data
+    original = client.get('/static/css/site.css')
+    assert original.status_code == 200 and not original.cache_control.immutable
+
+
+def test_regions_json_is_versioned_and_conditional(empty_db, client_as):
+    client = client_as()
+    url = f'/regions.{tabaro3.REGIONS_VERSION}.json'
+    response = client.get(url)
+    assert response.status_code == 200 and response.mimetype == 'application/json'
+    assert response.cache_control.immutable and 'Accept-Encoding' in response.vary
+    assert client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['ETag'] != response.headers['ETag']
+    assert gzip.decompress(compressed.data) == response.data
+
+    stale = client.get('/regions.0000000000.json')
+    assert stale.status_code == 302 and stale.headers['Location'].endswith(url)
@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from cache import LRUCache, NullCache, RedisCache, cached
+from conftest import DownRedis, FakeRedis
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+
+def test_lru_ttl_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = LRUCache(default_ttl=10)
+    cache.set('a', 1)
+    now[0] += 11
+    assert cache.get('a', 'miss') == 'miss'
+
+
+def test_redis_round_trip_and_prefix():
+    client = FakeRedis()
+    cache = RedisCache(client, key_prefix='t:')
+    cache.set('a', {'x': [1, 2]})
+    assert cache.get('a') == {'x': [1, 2]}
+    assert list(client.data) == ['t:a']
+    client.set('other', b'1')
+    cache.clear()
+    assert list(client.data) == ['other']
+
+
+def test_redis_incr_reads_with_zero_and_sets_ttl():
+    client = FakeRedis()
+    cache = RedisCache(client)
+    assert cache.incr('version', 0) == 0
+    assert cache.incr('version') == 1
+    assert cache.incr('hits', ttl=60) == 1
+    assert 'hits' in client.expiry and 'version' not in client.expiry
+
+
+@pytest.mark.parametrize('backend', [LRUCache(), NullCache(), RedisCache(FakeRedis())])
+def test_cached_decorator_keys_on_arguments(backend):
+    calls = []
+
+    @cached(backend, 'square')
+    def square(n):
+        calls.append(n)
+        return n * n
+
+    assert square(3) == 9 and square(3) == 9 and square(4) == 16
+    square.invalidate(3)
+    square(3)
+    expected = [3, 4, 3] if not isinstance(backend, NullCache) else [3, 3, 4, 3]
+    assert calls == expected
+
+
+def test_null_cache_counters_are_unknown():
+    assert NullCache().incr('version', 0) is None
+
+
+def test_redis_outage_degrades_to_misses():
+    cache = RedisCache(DownRedis())
+    assert cache.get('a', 'miss') == 'miss'
+    cache.set('a', 1)
+    cache.delete('a')
+    cache.clear()
+    assert cache.incr('version', 0) is None
+
+
+def test_search_and_request_blood_survive_redis_outage(empty_db, client_as, monkeypatch):
+    import app as tabaro3
+    from conftest import make_user
+
+    donor = make_user('donor')
+    monkeypatch.setattr(tabaro3, 'cache', RedisCache(DownRedis()))
+    client = client_as(donor.id)
+    response = client.get('/search', query_string={'blood_type': 'O+', 'state': '16 - الجزائر'})
+    assert response.status_code == 200 and 'donor' in response.get_data(as_text=True)
+
+    pending = tabaro3.jobs.stats().get('pending', 0)
+    response = client.post('/request_blood', data={
+        'blood_type': 'O+', 'units_needed': '1', 'hospital': 'H', 'state': '16 - الجزائر',
+        'contact_phone': '0500000000',
+    })
+    assert response.status_code == 302
+    assert tabaro3.jobs.stats().get('pending', 0) == pending + 1
+
+
+def test_request_blood_enqueues_match_before_invalidating(empty_db, client_as, monkeypatch):
+    import app as tabaro3
+    from conftest import make_user
+
+    def broken():
+        raise RuntimeError('invalidate failed')
+
+    user = make_user('requester')
+    monkeypatch.setattr(tabaro3, 'invalidate_home_requests', broken)
+    pending = tabaro3.jobs.stats().get('pending', 0)
+    with pytest.raises(RuntimeError):
+        client_as(user.id).post('/request_blood', data={
+            'blood_type': 'A+', 'units_needed': '1', 'hospital': 'H', 'state': '16 - الجزائر',
+            'contact_phone': '0500000000',
+        })
+    assert tabaro3.jobs.stats().get('pending', 0) == pending + 1
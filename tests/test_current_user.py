@@ -0,0 +1,75 @@
+import app as tabaro3
+from conftest import make_user
+
+STATE = '16 - الجزائر'
+
+
+def user_lookups(statements):
+    # PostgreSQL يحيط اسم الجدول user بعلامتي تنصيص
+    unquoted = [statement.replace('"', '') for statement in statements]
+    return [s for s in unquoted if 'FROM user' in s and 'WHERE user.id' in s]
+
+
+def add_request(requester, fulfilled=False):
+    blood_request = tabaro3.BloodRequest(
+        requester_id=requester.id, blood_type='A+', units_needed=1, hospital='H', city=STATE,
+        contact_phone='0500000000', is_fulfilled=fulfilled,
+    )
+    tabaro3.db.session.add(blood_request)
+    tabaro3.db.session.flush()
+    tabaro3.refresh_request_matches(blood_request.id)
+    tabaro3.db.session.commit()
+
+
+def test_dashboard_query_count_does_not_grow_with_requests(empty_db, client_as, page_queries, app):
+    user = make_user('requester', is_donor=False)
+    user_id = user.id
+    for i in range(6):
+        make_user(f'donor{i}', blood_type=['A+', 'O-', 'A-'][i % 3])
+    client = client_as(user_id)
+    without_requests = page_queries(client, '/dashboard')
+
+    requester = tabaro3.User.query.get(user_id)
+    for _ in range(4):
+        add_request(requester)
+    add_request(requester, fulfilled=True)
+    app.config['DONOR_MATCH_LIMIT'] = 2
+    try:
+        counter = page_queries(client, '/dashboard')
+        response = client.get('/dashboard')
+    finally:
+        app.config['DONOR_MATCH_LIMIT'] = 50
+
+    assert without_requests.count == 2
+    # المستخدم، طلباته، والمتبرعون المقترحون لكل الطلبات المفتوحة معاً
+    assert counter.count == 3, '\n'.join(counter.statements)
+    assert len(user_lookups(counter.statements)) == 1
+    body = response.get_data(as_text=True)
+    assert body.count('donor0') == 4 and 'donor2' not in body
+
+
+def test_current_user_is_loaded_once_per_request(empty_db, app):
+    from querycount import count_queries
+
+    user_id = make_user('someone').id
+    with app.test_request_context():
+        tabaro3.session['user_id'] = user_id
+        with count_queries(tabaro3.db.engine) as counter:
+            first = tabaro3.get_current_user()
+            assert tabaro3.get_current_user() is first
+        assert counter.count == 1
+
+        # بعد تعديل الملف أو تسجيل الخروج يُقرأ المستخدم من جديد
+        tabaro3.forget_current_user()
+        tabaro3.session.pop('user_id')
+        assert tabaro3.get_current_user() is None
+
+
+def test_profile_edit_is_visible_on_next_page(empty_db, client_as):
+    user = make_user('editor')
+    client = client_as(user.id)
+    client.post('/edit_profile', data={
+        'full_name': 'New Name', 'email': 'editor@example.com', 'phone': '0500000000',
+        'blood_type': 'O+', 'state': STATE, 'city': 'باب الوادي', 'is_donor': 'on',
+    })
+    assert 'New Name' in client.get('/dashboard').get_data(as_text=True)
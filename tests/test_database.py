@@ -0,0 +1,120 @@
+"""إعدادات المحرك، واختبارات PostgreSQL التي تعمل فقط مع TEST_DATABASE_URL=postgresql://...
+
+    TEST_DATABASE_URL=postgresql://user@localhost/tabaro3_test python -m pytest tests
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy.pool import QueuePool
+
+import app as tabaro3
+from conftest import make_user, requires_postgres
+
+
+def test_database_uri_accepts_postgres_scheme(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgres://u:p@db/tabaro3')
+    assert tabaro3.database_uri() == 'postgresql://u:p@db/tabaro3'
+
+
+def test_engine_options_from_environment(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '3')
+    monkeypatch.setenv('DB_POOL_PRE_PING', 'false')
+    assert tabaro3.engine_options('sqlite:///x.db') == {'pool_pre_ping': False}
+    options = tabaro3.engine_options('postgresql://db/tabaro3')
+    assert options == dict(pool_pre_ping=False, pool_size=3, max_overflow=20, pool_recycle=1800, pool_timeout=30)
+
+
+@requires_postgres
+def test_postgres_engine_uses_configured_pool(app):
+    engine = tabaro3.db.engine
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    assert engine.dialect.name == 'postgresql'
+    assert isinstance(engine.pool, QueuePool)
+    assert engine.pool.size() == options['pool_size'] and engine.pool._pre_ping
+
+
+@requires_postgres
+def test_postgres_check_db(empty_db, app):
+    result = app.test_cli_runner().invoke(args=['check-db'])
+    assert result.exit_code == 0, result.output
+    assert 'dialect: postgresql' in result.output and result.output.rstrip().endswith('ok')
+
+
+@requires_postgres
+@pytest.mark.parametrize('descending', [False, True])
+def test_postgres_keyset_pagination_with_row_values(empty_db, descending):
+    BloodRequest = tabaro3.BloodRequest
+    requester = make_user('requester')
+    # تواريخ مكررة حتى تحسم مقارنة (created_at, id) الترتيب
+    for i in range(23):
+        tabaro3.db.session.add(BloodRequest(
+            requester_id=requester.id, blood_type='A+', units_needed=1, hospital='H', city='16 - الجزائر',
+            contact_phone='0500000000', created_at=datetime(2026, 1, 1 + i % 4),
+        ))
+    tabaro3.db.session.commit()
+    keys = (BloodRequest.created_at, BloodRequest.id)
+    key_of = lambda r: (r.created_at, r.id)
+    expected = sorted(BloodRequest.query.all(), key=key_of, reverse=descending)
+
+    def decode(cursor):
+        return tabaro3.decode_cursor(cursor, tabaro3.cursor_datetime, int)
+
+    def paginate(**kwargs):
+        return tabaro3.keyset_paginate(BloodRequest.query, keys, key_of, per_page=5, descending=descending, **kwargs)
+
+    pages = [paginate()]
+    while pages[-1].next_cursor:
+        pages.append(paginate(after=decode(pages[-1].next_cursor)))
+    assert [r.id for page in pages for r in page.items] == [r.id for r in expected]
+
+    # الرجوع من الصفحة الأخيرة يعيد نفس الصفحات بالعكس
+    back = pages[-1]
+    for page in reversed(pages[:-1]):
+        back = paginate(before=decode(back.prev_cursor))
+        assert [r.id for r in back.items] == [r.id for r in page.items]
+    assert back.prev_cursor is None
+
+
+@requires_postgres
+def test_postgres_insert_donor_matches(synthetic_db):
+    db, BloodRequest, User, RequestDonorMatch = tabaro3.db, tabaro3.BloodRequest, tabaro3.User, tabaro3.RequestDonorMatch
+    limit = tabaro3.app.config['DONOR_MATCH_STORE_LIMIT']
+    donors = User.query.filter_by(is_donor=True).all()
+    for blood_request in BloodRequest.query.filter_by(is_fulfilled=False):
+        candidates = sorted(
+            (donor for donor in donors
+             if donor.city == blood_request.city and donor.id != blood_request.requester_id
+             and donor.blood_type in tabaro3.BLOOD_COMPATIBILITY[blood_request.blood_type]),
+            key=lambda donor: (donor.blood_type != blood_request.blood_type, donor.id),
+        )[:limit]
+        stored = RequestDonorMatch.query.filter_by(request_id=blood_request.id).all()
+        assert {m.donor_id for m in stored} == {d.id for d in candidates}
+        assert all(m.is_exact == (m.donor.blood_type == blood_request.blood_type) for m in stored)
+
+    # إعادة البناء تعطي نفس العدد
+    before = RequestDonorMatch.query.count()
+    RequestDonorMatch.query.delete()
+    assert tabaro3.insert_donor_matches() == before
+    db.session.rollback()
+
+
+def test_insert_match_rows_skips_stored_pair(empty_db):
+    # كاتب آخر أدرج الزوج بعد فحص NOT EXISTS: الإدراج يتجاهله بدل IntegrityError
+    db, RequestDonorMatch = tabaro3.db, tabaro3.RequestDonorMatch
+    requester, donor, other = make_user('requester'), make_user('donor'), make_user('other')
+    blood_request = tabaro3.BloodRequest(
+        requester_id=requester.id, blood_type='O+', units_needed=1, hospital='H', city=requester.city,
+        contact_phone='0500000000',
+    )
+    db.session.add(blood_request)
+    db.session.flush()
+    db.session.add(RequestDonorMatch(request_id=blood_request.id, donor_id=donor.id, is_exact=True))
+    db.session.commit()
+
+    # الزوج المحفوظ وزوج جديد لنفس الطلب، من جدول المستخدمين وحده
+    pairs = db.select(
+        db.literal(blood_request.id), tabaro3.User.id, db.literal(True), db.literal(datetime.utcnow(), db.DateTime),
+    ).where(tabaro3.User.id.in_([donor.id, other.id]))
+    assert tabaro3.insert_match_rows(pairs) == 1
+    db.session.commit()
+    assert {m.donor_id for m in RequestDonorMatch.query} == {donor.id, other.id}
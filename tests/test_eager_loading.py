@@ -0,0 +1,29 @@
+import pytest
+
+import app as tabaro3
+from conftest import make_user
+
+LISTINGS = ['/requests', '/admin/panels/requests', '/admin/panels/reports', '/admin/panels/users']
+
+
+def add_rows(prefix, count):
+    """count مستخدمين، لكل منهم طلب دم وبلاغ."""
+    for i in range(count):
+        user = make_user(f'{prefix}{i}')
+        tabaro3.db.session.add(tabaro3.BloodRequest(
+            requester_id=user.id, blood_type='A+', units_needed=1, hospital='H', city='16 - الجزائر',
+            contact_phone='0500000000',
+        ))
+        tabaro3.db.session.add(tabaro3.DonorReport(donor_id=user.id, report_type='other', report_details='d'))
+    tabaro3.db.session.commit()
+
+
+@pytest.mark.parametrize('url', LISTINGS)
+def test_listing_queries_do_not_grow_with_rows(url, empty_db, client_as, page_queries):
+    client = client_as(make_user('admin', is_admin=True, is_donor=False).id)
+    add_rows('few', 2)
+    few = page_queries(client, url)
+    add_rows('many', 20)
+    many = page_queries(client, url)
+    # علاقات requester وdonor محملة مع الصفوف، لا استعلام لكل صف
+    assert many.count == few.count, '\n'.join(many.statements)
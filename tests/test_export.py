@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+import app as tabaro3
+from conftest import make_user, requires_postgres
+
+
+@pytest.fixture
+def admin_client(empty_db, client_as):
+    admin = make_user('admin', is_admin=True, is_donor=False)
+    return client_as(admin.id)
+
+
+def export(client, kind, fmt):
+    response = client.get(f'/admin/export/{kind}.{fmt}')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'].startswith(f'attachment; filename="{kind}-')
+    return response
+
+
+def test_csv_export_neutralizes_formulas_from_public_forms(admin_client, client_as):
+    donor = make_user('donor', full_name='=HYPERLINK("http://evil","x")')
+    client_as().post(f'/report_donor/{donor.id}', data={
+        'report_type': 'other', 'report_details': '@SUM(1+1)', 'reporter_name': "=cmd|' /C calc'!A0",
+        'reporter_contact': '+213500000000',
+    })
+    users = list(csv.DictReader(io.StringIO(export(admin_client, 'users', 'csv').get_data(as_text=True).lstrip('﻿'))))
+    assert users[1]['full_name'] == '\'=HYPERLINK("http://evil","x")'
+    assert users[0]['full_name'] == 'admin'
+    report, = csv.DictReader(io.StringIO(export(admin_client, 'reports', 'csv').get_data(as_text=True).lstrip('﻿')))
+    assert report['reporter_name'] == "'=cmd|' /C calc'!A0"
+    assert report['report_details'] == "'@SUM(1+1)"
+    assert report['reporter_contact'] == "'+213500000000"
+    assert report['donor'] == 'donor'
+
+
+def test_csv_export_shape(admin_client):
+    response = export(admin_client, 'users', 'csv')
+    assert response.mimetype == 'text/csv'
+    text = response.get_data(as_text=True)
+    assert text.startswith('﻿id,username,email,full_name,')
+    assert 'password' not in text.splitlines()[0]
+    assert len(text.strip().splitlines()) == 2
+
+
+def test_json_export_keeps_raw_values(admin_client):
+    make_user('donor', full_name='=1+1')
+    response = export(admin_client, 'users', 'json')
+    assert response.mimetype == 'application/json'
+    rows = json.loads(response.get_data(as_text=True))
+    assert [row['username'] for row in rows] == ['admin', 'donor']
+    assert rows[1]['full_name'] == '=1+1' and 'password' not in rows[1]
+    datetime.fromisoformat(rows[1]['created_at'])
+
+
+def test_export_requires_admin_and_known_kind(admin_client, client_as):
+    donor = make_user('donor')
+    assert client_as(donor.id).get('/admin/export/users.csv').status_code == 302
+    assert admin_client.get('/admin/export/passwords.csv').status_code == 404
+    assert admin_client.get('/admin/export/users.xml').status_code == 404
+
+
+@requires_postgres
+def test_streamed_export_returns_its_connection(admin_client):
+    for kind in ('users', 'requests', 'reports'):
+        export(admin_client, kind, 'json').get_data()
+    tabaro3.db.session.remove()
+    assert tabaro3.db.engine.pool.checkedout() == 0
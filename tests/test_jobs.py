@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from jobs import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.db'), max_attempts=2, lease_seconds=60, retry_delay=0)
+    queue.calls = []
+
+    @queue.task
+    def record(value):
+        queue.calls.append(value)
+
+    @queue.task
+    def explode():
+        raise RuntimeError('boom')
+
+    return queue
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+def test_jobs_run_by_priority_then_order(queue):
+    queue.enqueue('record', priority=2, value='late')
+    queue.enqueue('record', value='first')
+    queue.enqueue('record', value='second')
+    queue.work('test', until_idle=True)
+    assert queue.calls == ['first', 'second', 'late']
+    assert queue.stats() == {'done': 3}
+    with pytest.raises(KeyError):
+        queue.enqueue('missing')
+
+
+def test_failing_job_stops_after_max_attempts(queue):
+    queue.enqueue('explode')
+    queue.work('test', until_idle=True)
+    assert queue.stats() == {'failed': 1}
+    attempts, error = queue._connect().execute('SELECT attempts, last_error FROM job').fetchone()
+    assert attempts == 2 and 'boom' in error
+
+
+def test_expired_lease_returns_job_to_pending(queue, clock):
+    queue.enqueue('record', value='retried')
+    assert queue.claim('crashed') is not None
+    assert queue.claim('other') is None
+    clock[0] += 61
+    queue.work('other', until_idle=True)
+    assert queue.calls == ['retried'] and queue.stats() == {'done': 1}
+
+
+def test_expired_lease_on_last_attempt_fails_job(queue, clock):
+    queue.enqueue('record', value='never')
+    for _ in range(queue.max_attempts):
+        assert queue.claim('crashed') is not None
+        clock[0] += 61
+    assert queue.claim('other') is None
+    assert queue.calls == [] and queue.stats() == {'failed': 1}
+    assert queue._connect().execute('SELECT last_error FROM job').fetchone() == ('lease expired',)
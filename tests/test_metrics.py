@@ -0,0 +1,91 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import app as tabaro3
+from conftest import make_user
+from metrics import RequestMetrics
+
+
+def worker(directory, responses, gauge):
+    metrics = RequestMetrics(directory=directory and str(directory))
+    metrics.latency['home', 'GET'].observe(0.02)
+    metrics.responses['home', 'GET', 200] += responses
+    metrics.collectors.append(lambda: [('jobs', 'gauge', 'Jobs.', [(dict(status='pending'), gauge)])])
+    return metrics
+
+
+def samples(text):
+    return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+
+def test_render_sums_counters_across_workers(tmp_path):
+    first, second = worker(tmp_path, 2, gauge=7), worker(tmp_path, 3, gauge=7)
+    second.latency['search', 'GET'].observe(3)
+    second.flush()
+    values = samples(first.render())
+    assert values['tabaro3_responses_total{endpoint="home",method="GET",status="200"}'] == '5'
+    assert values['tabaro3_request_duration_seconds_count{endpoint="home",method="GET"}'] == '2'
+    assert values['tabaro3_request_duration_seconds_bucket{endpoint="home",method="GET",le="0.025"}'] == '2'
+    assert values['tabaro3_request_duration_seconds_bucket{endpoint="search",method="GET",le="2.5"}'] == '0'
+    assert values['tabaro3_request_duration_seconds_bucket{endpoint="search",method="GET",le="+Inf"}'] == '1'
+    # gauge يُقرأ من مصدر مشترك فلا يُجمع
+    assert values['tabaro3_jobs{status="pending"}'] == '7'
+    assert samples(second.render()) == values
+
+
+def test_render_without_directory_is_per_worker(tmp_path):
+    values = samples(worker(None, 2, gauge=1).render())
+    assert values['tabaro3_responses_total{endpoint="home",method="GET",status="200"}'] == '2'
+    assert not list(tmp_path.iterdir())
+
+
+@pytest.fixture
+def metrics_enabled(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, 'METRICS_ENABLED', True)
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'secret')
+    monkeypatch.setattr(tabaro3, 'metrics', RequestMetrics(directory=str(tmp_path)))
+    tabaro3.metrics.collectors += [tabaro3.login_throttle_metrics, tabaro3.job_queue_metrics]
+
+
+def test_metrics_endpoint_is_hidden_when_disabled(empty_db, client_as):
+    assert client_as().get('/admin/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 404
+
+
+def test_metrics_endpoint_requires_token_or_admin(empty_db, metrics_enabled, client_as):
+    donor, admin = make_user('donor').id, make_user('admin', is_admin=True).id
+    assert client_as().get('/admin/metrics').status_code == 403
+    assert client_as().get('/admin/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    assert client_as(donor).get('/admin/metrics').status_code == 403
+    assert client_as(admin).get('/admin/metrics').status_code == 200
+
+    response = client_as().get('/admin/metrics', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    text = response.get_data(as_text=True)
+    assert '# TYPE tabaro3_request_duration_seconds histogram' in text
+    assert '# TYPE tabaro3_login_attempts_total counter' in text
+    assert '# TYPE tabaro3_jobs gauge' in text
+
+
+def test_failed_statement_leaves_nothing_on_the_pooled_connection():
+    engine = create_engine('sqlite://')
+    flask_app = Flask(__name__)
+    metrics = RequestMetrics()
+    metrics.init_app(flask_app, engine)
+
+    @flask_app.route('/')
+    def page():
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM missing'))
+            conn.execute(text('SELECT 1'))
+        return 'ok'
+
+    client = flask_app.test_client()
+    for _ in range(3):
+        client.get('/')
+    with engine.connect() as conn:
+        assert conn.info.get('metrics_query_start', []) == []
+    assert float(samples(metrics.render())['tabaro3_request_sql_queries_sum{endpoint="page"}']) == 3
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+from passwords import HasherBusy, PasswordHasher
+
+FAST = 'pbkdf2:sha256:1000'
+
+
+def test_hash_and_verify_on_pool_and_inline():
+    for workers in (2, 0):
+        hasher = PasswordHasher(FAST, max_workers=workers)
+        pwhash = hasher.hash('secret')
+        assert hasher.verify(pwhash, 'secret')
+        assert not hasher.verify(pwhash, 'wrong')
+        assert hasher.verify_and_update(pwhash, 'secret') == (True, None)
+
+
+def test_rehash_when_method_changes():
+    pwhash = PasswordHasher(FAST, max_workers=0).hash('secret')
+    verified, new_hash = PasswordHasher('pbkdf2:sha256:2000', max_workers=0).verify_and_update(pwhash, 'secret')
+    assert verified and new_hash.startswith('pbkdf2:sha256:2000$')
+
+
+def test_no_rehash_when_method_omits_parameters():
+    hasher = PasswordHasher('pbkdf2:sha256', max_workers=0)
+    pwhash = hasher.hash('secret')
+    assert pwhash.split('$', 1)[0] != 'pbkdf2:sha256'
+    assert not hasher.needs_rehash(pwhash)
+    assert hasher.verify_and_update(pwhash, 'secret') == (True, None)
+
+
+def test_full_queue_raises_busy():
+    hasher = PasswordHasher(FAST, max_workers=1, max_pending=0)
+    release = threading.Event()
+    waiter = threading.Thread(target=hasher._run, args=(release.wait,))
+    waiter.start()
+    try:
+        with pytest.raises(HasherBusy):
+            hasher.hash('secret')
+    finally:
+        release.set()
+        waiter.join()
+    assert hasher.verify(hasher.hash('secret'), 'secret')
+
+
+def test_timeout_raises_busy_and_keeps_slot_until_hash_finishes():
+    hasher = PasswordHasher(FAST, max_workers=1, max_pending=0, timeout=0.05)
+    release, finished = threading.Event(), threading.Event()
+
+    def slow():
+        release.wait()
+        finished.set()
+
+    with pytest.raises(HasherBusy):
+        hasher._run(slow)
+    # التجزئة الأولى ما زالت تشغل المجمع، فلا يُقبل غيرها
+    with pytest.raises(HasherBusy):
+        hasher._run(lambda: None)
+    release.set()
+    assert finished.wait(1)
+    hasher._executor.submit(lambda: None).result()
+    assert hasher.verify(hasher.hash('secret'), 'secret')
@@ -0,0 +1,128 @@
+import cProfile
+import json
+import os
+import time
+
+import pytest
+from flask import Flask
+
+import app as tabaro3
+from conftest import make_user
+from profiling import Profiler, ProfilerBusy, stats_text
+
+
+def wait_idle(profiler):
+    # القفل يُحرر بعد كتابة الملف في خيط العينات
+    assert profiler._sampling.acquire(timeout=5)
+    profiler._sampling.release()
+
+
+@pytest.mark.parametrize('seconds, interval', [(1, float('nan')), (1, float('inf')), (float('nan'), 0.01)])
+def test_sample_rejects_non_finite_values(tmp_path, seconds, interval):
+    profiler = Profiler(str(tmp_path))
+    with pytest.raises(ValueError):
+        profiler.sample(seconds, interval=interval)
+    assert profiler._sampling.acquire(blocking=False)
+
+
+def test_sample_interval_is_capped_by_duration(tmp_path):
+    profiler = Profiler(str(tmp_path))
+    started = time.monotonic()
+    thread, name = profiler.sample(0.2, interval=1e9, fmt='collapsed')
+    with pytest.raises(ProfilerBusy):
+        profiler.sample(0.2)
+    thread.join(5)
+    assert not thread.is_alive() and time.monotonic() - started < 2
+    assert os.path.isfile(tmp_path / name)
+    wait_idle(profiler)
+
+
+def test_sample_writes_speedscope(tmp_path):
+    profiler = Profiler(str(tmp_path))
+    thread, name = profiler.sample(0.1, interval=0.01)
+    thread.join(5)
+    profile = json.loads((tmp_path / name).read_text(encoding='utf-8'))
+    assert profile['profiles'] and all(p['type'] == 'sampled' for p in profile['profiles'])
+
+
+def test_profile_header_saves_request_profile(tmp_path):
+    allowed = [True]
+    flask_app = Flask(__name__)
+    profiler = Profiler(str(tmp_path))
+    profiler.init_app(flask_app, lambda: allowed[0])
+
+    @flask_app.route('/work')
+    def work():
+        return str(sum(range(1000)))
+
+    client = flask_app.test_client()
+    assert 'X-Profile-File' not in client.get('/work').headers
+    name = client.get('/work', headers={'X-Profile': '1'}).headers['X-Profile-File']
+    assert name.startswith('request-work-') and name.endswith('.prof')
+    assert 'work' in stats_text(str(tmp_path / name))
+    allowed[0] = False
+    assert 'X-Profile-File' not in client.get('/work', headers={'X-Profile': '1'}).headers
+    assert [f['name'] for f in profiler.files()] == [name]
+
+
+@pytest.fixture
+def profiling(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, 'PROFILING_ENABLED', True)
+    monkeypatch.setitem(app.config, 'PROFILING_TOKEN', 'secret')
+    profiler = Profiler(str(tmp_path), max_seconds=1)
+    monkeypatch.setattr(tabaro3, 'profiler', profiler)
+    return profiler
+
+
+def test_profile_endpoints_are_hidden_when_disabled(empty_db, client_as):
+    headers = {'Authorization': 'Bearer secret'}
+    assert client_as().post('/admin/profile', headers=headers).status_code == 404
+    assert client_as().get('/admin/profiles', headers=headers).status_code == 404
+
+
+def test_profile_endpoints_require_token_or_admin(empty_db, profiling, client_as):
+    donor = make_user('donor').id
+    assert client_as().post('/admin/profile').status_code == 403
+    assert client_as(donor).get('/admin/profiles').status_code == 403
+    assert client_as(donor).get('/admin/profiles/x.prof').status_code == 403
+
+
+def test_admin_profile_samples_in_background(empty_db, profiling, client_as):
+    client = client_as(make_user('admin', is_admin=True).id)
+    response = client.post('/admin/profile?seconds=0.1&interval=0.01')
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['pid'] == os.getpid() and body['url'] == f"/admin/profiles/{body['file']}"
+    wait_idle(profiling)
+    assert [f['name'] for f in client.get('/admin/profiles').get_json()['profiles']] == [body['file']]
+    assert client.get(body['url']).status_code == 200
+
+
+def test_admin_profile_rejects_bad_arguments(empty_db, profiling, client_as):
+    client = client_as()
+    headers = {'Authorization': 'Bearer secret'}
+    assert client.post('/admin/profile?interval=nan', headers=headers).status_code == 400
+    assert client.post('/admin/profile?seconds=inf', headers=headers).status_code == 400
+    assert client.post('/admin/profile?format=svg', headers=headers).status_code == 400
+    assert profiling.files() == []
+
+    response = client.post('/admin/profile?seconds=0.1&format=collapsed&wait=1', headers=headers)
+    assert response.status_code == 200 and response.headers['Content-Disposition'].startswith('attachment')
+    wait_idle(profiling)
+
+
+def test_admin_profile_file_summarizes_prof(empty_db, profiling, client_as):
+    profile = cProfile.Profile()
+    profile.runcall(sorted, range(100))
+    profile.dump_stats(os.path.join(profiling.directory, 'request-home-1.prof'))
+    client = client_as()
+    headers = {'Authorization': 'Bearer secret'}
+
+    response = client.get('/admin/profiles/request-home-1.prof?format=text&sort=tottime', headers=headers)
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    assert 'function calls' in response.get_data(as_text=True)
+    assert client.get('/admin/profiles/request-home-1.prof?format=text&sort=name', headers=headers).status_code == 400
+    assert client.get('/admin/profiles/missing.prof?format=text', headers=headers).status_code == 404
+    assert client.get('/admin/profiles/missing.prof', headers=headers).status_code == 404
+    download = client.get('/admin/profiles/request-home-1.prof', headers=headers)
+    assert download.status_code == 200 and download.headers['Content-Disposition'].startswith('attachment')
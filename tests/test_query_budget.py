@@ -0,0 +1,43 @@
+"""كل صفحة في query_budget.json ضمن حد استعلاماتها على قاعدة synthetic.py، بمستخدم مدير له
+طلبات مفتوحة ذات متبرعين مقترحين، حتى تمر /dashboard بمسار المطابقة كاملاً."""
+import pytest
+
+import app as tabaro3
+from querycount import assert_max_queries, cold_request, load_budget
+
+BUDGET = load_budget(tabaro3.QUERY_BUDGET_PATH)
+
+
+@pytest.fixture(scope='module')
+def requester(synthetic_db):
+    db, BloodRequest, RequestDonorMatch = tabaro3.db, tabaro3.BloodRequest, tabaro3.RequestDonorMatch
+    requester_id, = db.session.query(BloodRequest.requester_id).join(
+        RequestDonorMatch, RequestDonorMatch.request_id == BloodRequest.id,
+    ).group_by(BloodRequest.requester_id).order_by(
+        db.func.count(db.distinct(BloodRequest.id)).desc(), BloodRequest.requester_id,
+    ).first()
+    user = tabaro3.User.query.get(requester_id)
+    user.is_admin = True
+    db.session.commit()
+    return user.id
+
+
+@pytest.mark.parametrize('url', list(BUDGET))
+def test_page_within_query_budget(url, requester, client_as):
+    client = client_as(requester)
+    with cold_request(tabaro3), assert_max_queries(tabaro3.db.engine, BUDGET[url], url):
+        response = client.get(url)
+        # إعادة توجيه أو خطأ مبكر ينفذ استعلامات أقل، فلا يُقبل إلا العرض الكامل
+        assert response.status_code == 200
+
+
+def test_page_count_leaves_app_cache_alone(requester, client_as, page_queries):
+    tabaro3.cache.set('login:probe', 3)
+    version = tabaro3.cache.incr(tabaro3.SEARCH_VERSION_KEY, 0)
+    counter = page_queries(client_as(requester), '/')
+    # الصفحة الرئيسية محسوبة على الذاكرة الباردة المؤقتة، لا على ذاكرة التطبيق
+    assert counter.count and counter.seconds > 0
+    assert tabaro3.cache.get('login:probe') == 3
+    assert tabaro3.cache.incr(tabaro3.SEARCH_VERSION_KEY, 0) == version
+    assert tabaro3.cache.get('home:requests') is None
+    assert tabaro3.home_request_lists.cache is tabaro3.cache
@@ -0,0 +1,57 @@
+import time
+
+import app as tabaro3
+from cache import LRUCache, NullCache
+from conftest import make_user
+
+STATE = '16 - الجزائر'
+SEARCH = {'blood_type': 'O+', 'state': STATE}
+
+
+def search(client):
+    return client.get('/search', query_string=SEARCH).get_data(as_text=True)
+
+
+def test_search_cache_is_invalidated_by_donor_changes(empty_db, client_as):
+    first = make_user('first')
+    client = client_as()
+    assert 'first' in search(client)
+
+    client.post('/register', data={
+        'username': 'second', 'email': 'second@example.com', 'password': 'pw', 'full_name': 'second',
+        'phone': '0500000000', 'blood_type': 'O+', 'state': STATE, 'city': 'باب الوادي', 'is_donor': 'on',
+    })
+    assert 'second' in search(client)
+
+    admin = make_user('admin', is_admin=True, is_donor=False)
+    client_as(admin.id).post(f'/admin/edit_user/{first.id}', data={
+        'username': 'first', 'email': 'first@example.com', 'full_name': 'first', 'phone': '0500000000',
+        'blood_type': 'O+', 'state': '31 - وهران', 'city': 'وهران', 'is_donor': 'on',
+    })
+    assert 'first' not in search(client)
+
+
+def test_other_workers_local_cache_expires_after_ttl(empty_db, client_as, monkeypatch):
+    now = [time.monotonic()]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    # ذاكرة عامل آخر لم يصله رقم الإصدار الجديد
+    monkeypatch.setattr(tabaro3, 'cache', LRUCache())
+    make_user('early')
+    client = client_as()
+    assert 'early' in search(client)
+
+    make_user('late')
+    assert 'late' not in search(client)
+    now[0] += tabaro3.app.config['SEARCH_CACHE_TTL'] + 1
+    assert 'late' in search(client)
+    assert tabaro3.app.config['SEARCH_CACHE_TTL'] <= 30
+
+
+def test_null_cache_search_skips_the_cached_page(empty_db, client_as, monkeypatch):
+    def cached_keyset_page(*args):
+        raise AssertionError('search used the cached page without a cache')
+
+    monkeypatch.setattr(tabaro3, 'cache', NullCache())
+    monkeypatch.setattr(tabaro3, 'cached_keyset_page', cached_keyset_page)
+    make_user('donor')
+    assert 'donor' in search(client_as())
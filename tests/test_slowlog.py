@@ -0,0 +1,74 @@
+import json
+import time
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+
+import app as tabaro3
+from conftest import requires_postgres
+from slowlog import SlowQueryLog, summarize
+
+
+def test_slow_select_is_logged_with_plan(tmp_path):
+    path = tmp_path / 'slow.log'
+    engine = create_engine('sqlite://')
+    SlowQueryLog(str(path), threshold_ms=0).init_app(engine)
+    with engine.connect() as conn:
+        conn.execute(text('CREATE TABLE t (id INTEGER PRIMARY KEY, secret TEXT)'))
+        conn.execute(text('INSERT INTO t (secret) VALUES (:s)'), {'s': 'pbkdf2:sha256:1000$salt$hash'})
+        conn.execute(text('SELECT * FROM t WHERE id = :id'), {'id': 1})
+    records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    insert, select = records[1], records[2]
+    assert insert['plan'] is None and list(insert['parameters']) == ['<redacted>']
+    assert select['plan'] and 'USING INTEGER PRIMARY KEY' in select['plan'][0]
+    (_, group), = [item for item in summarize(path.read_text(encoding='utf-8').splitlines()) if item[0][1].startswith('SELECT')]
+    assert group['count'] == 1
+
+
+def test_failed_statement_is_not_logged(tmp_path):
+    path = tmp_path / 'slow.log'
+    engine = create_engine('sqlite://')
+    SlowQueryLog(str(path), threshold_ms=0).init_app(engine)
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text('SELECT * FROM missing'))
+        conn.execute(text('SELECT 1'))
+    statements = [json.loads(line)['statement'] for line in path.read_text(encoding='utf-8').splitlines()]
+    assert statements == ['SELECT 1']
+
+
+def test_duration_is_measured_from_its_own_statement(tmp_path):
+    # وقت بدء الاستعلام الفاشل لا يبقى، فيُقاس الاستعلام التالي من بدايته هو
+    path = tmp_path / 'slow.log'
+    engine = create_engine('sqlite://')
+    event.listen(engine, 'connect', lambda dbapi_connection, record: dbapi_connection.create_function(
+        'sleep_ms', 1, lambda ms: time.sleep(ms / 1000)))
+    SlowQueryLog(str(path), threshold_ms=0).init_app(engine)
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text('SELECT * FROM missing'))
+        time.sleep(0.2)
+        conn.execute(text('SELECT sleep_ms(50)'))
+    record, = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert record['statement'] == 'SELECT sleep_ms(50)'
+    assert 50 <= record['duration_ms'] < 200
+
+
+def test_failed_explain_is_reported(tmp_path):
+    slow_log = SlowQueryLog(str(tmp_path / 'slow.log'))
+    with create_engine('sqlite://').connect() as conn:
+        plan = slow_log.explain(conn, 'SELECT * FROM missing', ())
+    assert plan[0].startswith('EXPLAIN failed:')
+
+
+@requires_postgres
+def test_failed_explain_leaves_request_transaction_usable(app, tmp_path):
+    slow_log = SlowQueryLog(str(tmp_path / 'slow.log'))
+    with tabaro3.db.engine.connect() as conn, conn.begin():
+        conn.execute(text('CREATE TEMPORARY TABLE slowlog_probe (id integer)'))
+        conn.execute(text('INSERT INTO slowlog_probe VALUES (1)'))
+        assert slow_log.explain(conn, 'SELECT * FROM missing', {})[0].startswith('EXPLAIN failed:')
+        assert slow_log.explain(conn, 'SELECT * FROM slowlog_probe', {})
+        # المعاملة لم تُجهض وما كُتب قبل EXPLAIN باقٍ
+        assert conn.execute(text('SELECT count(*) FROM slowlog_probe')).scalar() == 1
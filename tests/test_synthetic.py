@@ -0,0 +1,59 @@
+import random
+from collections import Counter
+
+import pytest
+
+import app as tabaro3
+import load_test
+import synthetic
+from regions import is_daira
+
+
+def test_generator_is_reproducible():
+    first = list(synthetic._users(200, random.Random(7), 'x'))
+    assert first == list(synthetic._users(200, random.Random(7), 'x'))
+    assert first != list(synthetic._users(200, random.Random(8), 'x'))
+
+
+def test_distributions_follow_weights():
+    users = list(synthetic._users(20000, random.Random(1), 'x'))
+    assert all(is_daira(user['city'], user['district']) for user in users)
+
+    blood_types = Counter(user['blood_type'] for user in users)
+    share = blood_types['O+'] / len(users)
+    assert abs(share - 0.40) < 0.02 and blood_types['AB-'] < blood_types['B-'] < blood_types['A-']
+
+    states = Counter(user['city'] for user in users)
+    largest = max(synthetic.STATES, key=lambda state: len(synthetic.REGIONS[state]))
+    smallest = min(synthetic.STATES, key=lambda state: len(synthetic.REGIONS[state]))
+    assert states[largest] > 2 * states[smallest]
+
+
+def test_populate_counts(synthetic_db):
+    db = tabaro3.db
+    assert tabaro3.User.query.count() == 2001
+    assert tabaro3.BloodRequest.query.count() == 100
+    assert tabaro3.DonorReport.query.count() == 20
+    per_request = db.session.query(db.func.count()).select_from(tabaro3.RequestDonorMatch).group_by(
+        tabaro3.RequestDonorMatch.request_id,
+    ).all()
+    assert per_request and max(count for count, in per_request) <= tabaro3.app.config['DONOR_MATCH_STORE_LIMIT']
+    admin = tabaro3.User.query.filter_by(username=synthetic.ADMIN_USERNAME).one()
+    assert admin.is_admin and tabaro3.hasher.verify(admin.password, synthetic.PASSWORD)
+
+
+@pytest.mark.parametrize('scenario', load_test.SCENARIOS)
+def test_load_test_scenarios_succeed(scenario, synthetic_db, client_as, monkeypatch):
+    monkeypatch.setattr(load_test, 'LOGIN_USERS', 2000)
+    admin = tabaro3.User.query.filter_by(username=synthetic.ADMIN_USERNAME).one()
+    client = client_as(admin.id if scenario == 'admin_dashboard' else None)
+    rng = random.Random(3)
+    for _ in range(5):
+        method, path, form = load_test.scenario_request(scenario, rng)
+        response = client.open(path, method=method, data=form)
+        assert response.status_code == (302 if scenario == 'login' else 200), path
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert [load_test.percentile(values, p) for p in (0.5, 0.95, 0.99)] == [51, 96, 100]
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import app as tabaro3
+from cache import LRUCache, RedisCache
+from conftest import DownRedis, FakeRedis
+from throttle import CacheWindowLimiter, LoginThrottle, TokenBucketLimiter, create_login_throttle
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_token_bucket_refills_over_time(clock):
+    limiter = TokenBucketLimiter(capacity=2, refill_per_second=0.5)
+    assert [limiter.allow('ip') for _ in range(3)] == [True, True, False]
+    clock[0] += 1
+    assert not limiter.allow('ip')
+    clock[0] += 1
+    assert limiter.allow('ip') and not limiter.allow('ip')
+    # الدلو لا يتجاوز سعته مهما طال الانتظار
+    clock[0] += 3600
+    assert [limiter.allow('ip') for _ in range(3)] == [True, True, False]
+
+
+def test_token_bucket_forgets_least_recent_keys(clock):
+    limiter = TokenBucketLimiter(capacity=1, refill_per_second=0, max_keys=2)
+    assert limiter.allow('a') and limiter.allow('b') and not limiter.allow('a')
+    assert limiter.allow('c')
+    assert list(limiter._buckets) == ['a', 'c']
+
+
+@pytest.mark.parametrize('make_cache', [LRUCache, lambda: RedisCache(FakeRedis())], ids=['lru', 'redis'])
+def test_cache_window_is_shared_between_limiters(make_cache, clock, monkeypatch):
+    monkeypatch.setattr(time, 'time', lambda: 60.0)
+    shared = make_cache()
+    # عاملان بمحددين منفصلين على الخلفية نفسها: الحد للمجموع لا لكل عامل
+    first, second = [
+        CacheWindowLimiter(shared, 'login:user', 3, 60, TokenBucketLimiter(100, 0)) for _ in range(2)
+    ]
+    assert [first.allow('donor'), second.allow('donor'), first.allow('donor')] == [True, True, True]
+    assert not second.allow('donor') and not first.allow('donor')
+    assert second.allow('other')
+    # النافذة التالية تبدأ من الصفر
+    monkeypatch.setattr(time, 'time', lambda: 120.0)
+    assert first.allow('donor')
+
+
+def test_local_cache_throttle_does_not_share_the_app_cache(app):
+    config = dict(app.config, LOGIN_THROTTLE_BACKEND='cache', LOGIN_THROTTLE_MAX_KEYS=2)
+    app_cache = LRUCache(max_entries=10)
+    app_cache.set('home:requests', 'page')
+    throttle = create_login_throttle(config, app_cache)
+    for i in range(20):
+        throttle.check(f'10.0.0.{i}', f'user{i}')
+    assert app_cache.get('home:requests') == 'page'
+    assert throttle.ip_limiter.cache is not app_cache and throttle.ip_limiter.cache.max_entries == 2
+
+
+def test_login_throttle_rejects_by_username_across_addresses(clock):
+    throttle = LoginThrottle(TokenBucketLimiter(100, 0), TokenBucketLimiter(2, 0))
+    assert throttle.check('10.0.0.1', 'Donor') is None
+    assert throttle.check('10.0.0.2', ' donor ') is None
+    assert throttle.check('10.0.0.3', 'DONOR') == 'username'
+    assert throttle.check('10.0.0.3', 'other') is None
+    assert throttle.snapshot() == {'rejected_username': 1}
+
+
+def test_login_throttle_rejects_by_ip_before_username(clock):
+    throttle = LoginThrottle(TokenBucketLimiter(1, 0), TokenBucketLimiter(100, 0))
+    assert throttle.check('10.0.0.1', 'a') is None
+    assert throttle.check('10.0.0.1', 'b') == 'ip'
+    assert throttle.check('10.0.0.2', 'b') is None
+    assert throttle.snapshot() == {'rejected_ip': 1}
+
+
+def test_proxy_fix_keys_login_throttle_on_forwarded_client(empty_db, app, monkeypatch, clock):
+    monkeypatch.setattr(app, 'wsgi_app', ProxyFix(app.wsgi_app, x_for=1))
+    monkeypatch.setattr(tabaro3, 'login_throttle', LoginThrottle(TokenBucketLimiter(1, 0), TokenBucketLimiter(100, 0)))
+    client = app.test_client()
+
+    def login(client_ip):
+        return client.post(
+            '/login', data={'username': client_ip, 'password': 'x'}, headers={'X-Forwarded-For': client_ip},
+        ).status_code
+
+    # كل الطلبات تصل من عنوان الوكيل نفسه، والحد يُطبق على عنوان الزائر
+    assert [login('198.51.100.1'), login('198.51.100.2'), login('198.51.100.1')] == [200, 200, 429]
+
+
+def test_cache_login_throttle_survives_redis_outage(empty_db, app, monkeypatch):
+    config = dict(app.config, LOGIN_THROTTLE_BACKEND='cache', LOGIN_RATE_USERNAME_CAPACITY=2)
+    throttle = create_login_throttle(config, RedisCache(DownRedis()))
+    monkeypatch.setattr(tabaro3, 'login_throttle', throttle)
+    client = app.test_client()
+    statuses = [client.post('/login', data={'username': 'nobody', 'password': 'x'}).status_code for _ in range(3)]
+    # الحد المحلي البديل يبقى سارياً أثناء التعطل
+    assert statuses == [200, 200, 429]
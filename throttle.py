@@ -0,0 +1,120 @@
+"""تحديد معدل محاولات تسجيل الدخول لكل عنوان IP ولكل اسم مستخدم.
+
+الفحص يتم قبل جلب المستخدم وقبل PBKDF2، فلا تكلف المحاولات المرفوضة أي تجزئة.
+
+    local  دلو رموز (token bucket) داخل العملية
+    cache  نوافذ زمنية ثابتة على خلفية cache.py (Redis مثلاً) مشتركة بين العمال، ومع تعطلها
+           يعود كل عامل إلى دلو رموز محلي بنفس الحدود
+
+مع CACHE_TYPE=local تُحفظ النوافذ في LRUCache خاصة بحد LOGIN_THROTTLE_MAX_KEYS، حتى لا تُخرج
+دفعة من أسماء المستخدمين أو العناوين المختلفة مفاتيح البحث والصفحة الرئيسية من ذاكرة التطبيق.
+"""
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+    """capacity محاولة متتالية كحد أقصى، تتجدد بمعدل refill_per_second.
+
+    max_keys يحد الذاكرة: تُحذف المفاتيح الأقدم استخداماً أولاً.
+    """
+
+    def __init__(self, capacity, refill_per_second, max_keys=100000):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+
+class CacheWindowLimiter:
+    """limit محاولة لكل نافذة من window ثانية، بعداد ذري في خلفية التخزين المشتركة.
+
+    incr يعيد None عند تعطل الخلفية، فيُستشار fallback (محدد محلي) بدل رفض كل المحاولات.
+    """
+
+    def __init__(self, cache, prefix, limit, window, fallback):
+        self.cache = cache
+        self.prefix = prefix
+        self.limit = limit
+        self.window = window
+        self.fallback = fallback
+
+    def allow(self, key):
+        window_index = int(time.time() // self.window)
+        count = self.cache.incr(f'{self.prefix}:{key}:{window_index}', ttl=int(self.window) + 1)
+        if count is None:
+            logger.warning('login throttle cache unavailable, using the local limiter for %s', self.prefix)
+            return self.fallback.allow(key)
+        return count <= self.limit
+
+
+class LoginThrottle:
+    def __init__(self, ip_limiter, username_limiter):
+        self.ip_limiter = ip_limiter
+        self.username_limiter = username_limiter
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def check(self, ip, username):
+        """يعيد سبب الرفض ('ip' أو 'username') أو None إذا سُمح بالمحاولة."""
+        if not self.ip_limiter.allow(ip):
+            reason = 'ip'
+        elif username and not self.username_limiter.allow(username.strip().lower()):
+            reason = 'username'
+        else:
+            return None
+        self.record(f'rejected_{reason}')
+        return reason
+
+    def record(self, outcome):
+        with self._lock:
+            self.counters[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+def create_login_throttle(config, cache):
+    ip_capacity = config['LOGIN_RATE_IP_CAPACITY']
+    ip_rate = config['LOGIN_RATE_IP_PER_MINUTE'] / 60
+    user_capacity = config['LOGIN_RATE_USERNAME_CAPACITY']
+    user_rate = config['LOGIN_RATE_USERNAME_PER_MINUTE'] / 60
+    max_keys = config['LOGIN_THROTTLE_MAX_KEYS']
+    if config['LOGIN_THROTTLE_BACKEND'] == 'cache':
+        if isinstance(cache, LRUCache):
+            cache = LRUCache(max_keys, default_ttl=0)
+        return LoginThrottle(
+            CacheWindowLimiter(
+                cache, 'login:ip', ip_capacity, ip_capacity / ip_rate,
+                TokenBucketLimiter(ip_capacity, ip_rate, max_keys),
+            ),
+            CacheWindowLimiter(
+                cache, 'login:user', user_capacity, user_capacity / user_rate,
+                TokenBucketLimiter(user_capacity, user_rate, max_keys),
+            ),
+        )
+    return LoginThrottle(
+        TokenBucketLimiter(ip_capacity, ip_rate, max_keys),
+        TokenBucketLimiter(user_capacity, user_rate, max_keys),
+    )
@@ -1,4 +1,6 @@
-from app import app
+from app import app, start_job_workers
+
+start_job_workers()
 
 if __name__ == "__main__":
     app.run()
\ No newline at end of file